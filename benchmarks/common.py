@@ -0,0 +1,82 @@
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Awaitable, Callable
+
+import rsa
+from jose import jwt
+
+from src.core.config import settings
+
+
+def summarize(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    if not samples:
+        return {'count': 0}
+
+    def percentile(p: float) -> float:
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+
+    return {
+        'count': len(samples),
+        'mean_ms': sum(samples) / len(samples) * 1000,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': samples[-1] * 1000,
+    }
+
+
+async def measure(func: Callable[[], Awaitable], iterations: int, warmup: int = 10) -> dict:
+    for _ in range(warmup):
+        await func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def measure_sync(func: Callable, iterations: int, warmup: int = 10) -> dict:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+class LocalSigner:
+    # signs tokens with a throwaway RSA key and installs its public half as
+    # the verification key, so no auth server is needed
+
+    def __init__(self, bits: int = 2048):
+        public_key, private_key = rsa.newkeys(bits)
+        self.private_pem = private_key.save_pkcs1().decode()
+        self.public_pem = public_key.save_pkcs1().decode()
+        settings._Settings__public_key = self.public_pem
+        settings._Settings__public_key_last_update = datetime.utcnow()
+
+    def token(self, user_id) -> str:
+        return jwt.encode({'sub': str(user_id)}, self.private_pem, algorithm=settings.JWT_ALGORITHM)
+
+
+def emit(name: str, params: dict, results: dict, output: str = None):
+    report = {
+        'benchmark': name,
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'params': params,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from benchmarks.common import LocalSigner, emit, summarize
+from src.main import app
+
+ENDPOINTS = {
+    'unread': '/notifications/unread',
+    'last': '/notifications/?quantity=15',
+}
+
+
+async def run(dataset: dict, endpoint: str, requests: int, concurrency: int, heavy_share: float) -> dict:
+    signer = LocalSigner()
+    heavy_token = signer.token(dataset['heavy_user'])
+    tokens = [signer.token(user_id) for user_id in dataset['users']]
+    path = ENDPOINTS[endpoint]
+
+    samples = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                token = heavy_token if random.random() < heavy_share else random.choice(tokens)
+                start = time.perf_counter()
+                response = await client.get(path, headers={'Authorization': f'Bearer {token}'})
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {'latency': summarize(samples),
+            'errors': errors,
+            'throughput_rps': len(samples) / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the read endpoints in-process')
+    parser.add_argument('--dataset', default='bench_dataset.json')
+    parser.add_argument('--endpoint', choices=ENDPOINTS, default='unread')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--heavy-share', type=float, default=0.1,
+                        help='fraction of requests issued as the heavy user')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with open(args.dataset) as f:
+        dataset = json.load(f)
+    results = asyncio.run(run(dataset, args.endpoint, args.requests, args.concurrency, args.heavy_share))
+    emit('http_read_path', vars(args), results, args.output)
+
+
+if __name__ == '__main__':
+    main()
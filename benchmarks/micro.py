@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import LocalSigner, emit, measure, measure_sync
+from src.core.jwt_decoder import JWTDecoder
+from src.db.database import AsyncSessionFactory
+from src.repositories.notification_repository import SqlaNotificationRepository
+from src.schemas.notification import NotificationOut
+
+
+async def run(dataset: dict, iterations: int) -> dict:
+    signer = LocalSigner()
+    user_id = dataset['heavy_user']
+    token = signer.token(user_id)
+    results = {'jwt_decode': await measure(lambda: JWTDecoder.decode(token), iterations)}
+
+    async with AsyncSessionFactory() as session:
+        repository = SqlaNotificationRepository(session)
+        results['repository_get_unread'] = await measure(lambda: repository.get_unread(user_id), iterations)
+        results['repository_get_many_15'] = await measure(lambda: repository.get_many(user_id, 15), iterations)
+
+        rows = await repository.get_unread(user_id)
+        results['notification_out_from_orm'] = measure_sync(
+            lambda: [NotificationOut.from_orm(n) for n in rows], iterations)
+        results['notification_out_from_orm']['rows'] = len(rows)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for the read path')
+    parser.add_argument('--dataset', default='bench_dataset.json')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with open(args.dataset) as f:
+        dataset = json.load(f)
+    results = asyncio.run(run(dataset, args.iterations))
+    emit('micro', vars(args), results, args.output)
+
+
+if __name__ == '__main__':
+    main()
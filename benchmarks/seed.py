@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from src.db.database import AsyncSessionFactory
+from src.models.notifications import Notification, NotificationType
+
+
+def _rows(user_id: uuid.UUID, count: int, now: datetime):
+    for i in range(count):
+        yield {
+            'id': uuid.uuid4(),
+            'user_id': user_id,
+            'type': random.choice((NotificationType.SITE, NotificationType.SITE, NotificationType.EMAIL)),
+            'viewed': random.random() < 0.8,
+            'title': f'Notification {i}',
+            'message': 'Your order has been updated',
+            'created_at': now - timedelta(minutes=count - i),
+            'extra_data': {'order_id': random.randint(1, 10_000)},
+        }
+
+
+async def seed(users: int, heavy_rows: int, skew: float, chunk_size: int) -> dict:
+    now = datetime.utcnow()
+    heavy_user = uuid.uuid4()
+    # zipf-like: the k-th user gets heavy_rows / k**skew notifications
+    plan = [(heavy_user, heavy_rows)]
+    plan += [(uuid.uuid4(), max(1, int(heavy_rows / (k ** skew)))) for k in range(2, users + 1)]
+
+    total = 0
+    async with AsyncSessionFactory() as session:
+        for user_id, count in plan:
+            batch = []
+            for row in _rows(user_id, count, now):
+                batch.append(row)
+                if len(batch) >= chunk_size:
+                    await session.execute(insert(Notification), batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                await session.execute(insert(Notification), batch)
+                total += len(batch)
+            await session.commit()
+
+    return {'heavy_user': str(heavy_user),
+            'users': [str(user_id) for user_id, _ in plan],
+            'rows': total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed the database with a skewed notification dataset')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--heavy-rows', type=int, default=50_000)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--output', default='bench_dataset.json')
+    args = parser.parse_args()
+
+    dataset = asyncio.run(seed(args.users, args.heavy_rows, args.skew, args.chunk_size))
+    with open(args.output, 'w') as f:
+        json.dump(dataset, f)
+    print(f"Inserted {dataset['rows']} notifications for {len(dataset['users'])} users, "
+          f"heavy user {dataset['heavy_user']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""template versions
+
+Revision ID: 7e0a93c5b1d6
+Revises: d28b7e4f1a90
+Create Date: 2026-10-19 14:21:17.330462
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7e0a93c5b1d6"
+down_revision: Union[str, None] = "d28b7e4f1a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "template_versions",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("template_id", sa.UUID(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("body", sa.String(), nullable=False),
+        sa.Column("required_fields", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["template_id"], ["templates.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("template_id", "version"),
+    )
+    op.create_index(
+        op.f("ix_template_versions_template_id"),
+        "template_versions",
+        ["template_id"],
+        unique=False,
+    )
+    op.add_column(
+        "templates", sa.Column("current_version_id", sa.UUID(), nullable=True)
+    )
+    op.create_foreign_key(
+        "templates_current_version_id_fkey",
+        "templates",
+        "template_versions",
+        ["current_version_id"],
+        ["id"],
+    )
+    op.add_column(
+        "notifications",
+        sa.Column("template_version_id", sa.UUID(), nullable=True),
+    )
+    op.create_foreign_key(
+        "notifications_template_version_id_fkey",
+        "notifications",
+        "template_versions",
+        ["template_version_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+    # every existing template becomes version 1 of itself
+    op.execute(
+        """
+        INSERT INTO template_versions
+            (id, template_id, version, subject, body, required_fields, created_at)
+        SELECT gen_random_uuid(), id, 1, subject, body, required_fields, updated_at
+        FROM templates
+        """
+    )
+    op.execute(
+        """
+        UPDATE templates
+        SET current_version_id = template_versions.id
+        FROM template_versions
+        WHERE template_versions.template_id = templates.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "notifications_template_version_id_fkey",
+        "notifications",
+        type_="foreignkey",
+    )
+    op.drop_column("notifications", "template_version_id")
+    op.drop_constraint(
+        "templates_current_version_id_fkey", "templates", type_="foreignkey"
+    )
+    op.drop_column("templates", "current_version_id")
+    op.drop_index(
+        op.f("ix_template_versions_template_id"),
+        table_name="template_versions",
+    )
+    op.drop_table("template_versions")
@@ -0,0 +1,64 @@
+"""extra_data jsonb
+
+Revision ID: 5b9c2f61e0d7
+Revises: 7e0a93c5b1d6
+Create Date: 2026-10-19 15:39:44.071256
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b9c2f61e0d7"
+down_revision: Union[str, None] = "7e0a93c5b1d6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _with_index() -> bool:
+    # `alembic -x skip_extra_data_index=true upgrade head` leaves the GIN
+    # index out, e.g. to build it later by hand on a very large table
+    return context.get_x_argument(as_dictionary=True).get("skip_extra_data_index") != "true"
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "notifications",
+        "extra_data",
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using="extra_data::jsonb",
+    )
+    if _with_index():
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_notifications_extra_data",
+                "notifications",
+                ["extra_data"],
+                unique=False,
+                postgresql_using="gin",
+                postgresql_ops={"extra_data": "jsonb_path_ops"},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_notifications_extra_data",
+        table_name="notifications",
+        if_exists=True,
+    )
+    op.alter_column(
+        "notifications",
+        "extra_data",
+        existing_type=postgresql.JSONB(),
+        type_=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using="extra_data::json",
+    )
@@ -0,0 +1,36 @@
+"""notifications user_id created_at index
+
+Revision ID: c4e81d07a3f5
+Revises: 5b9c2f61e0d7
+Create Date: 2026-10-19 16:22:09.517380
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e81d07a3f5"
+down_revision: Union[str, None] = "5b9c2f61e0d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_notifications_user_id_created_at",
+            "notifications",
+            ["user_id", "created_at"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_notifications_user_id_created_at", table_name="notifications"
+    )
@@ -0,0 +1,52 @@
+"""template daily stats
+
+Revision ID: 9f3a6b1c72e8
+Revises: c4e81d07a3f5
+Create Date: 2026-10-19 16:48:31.204417
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9f3a6b1c72e8"
+down_revision: Union[str, None] = "c4e81d07a3f5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "template_daily_stats",
+        sa.Column("template_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("sent", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("viewed", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["template_id"], ["templates.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("template_id", "day"),
+    )
+    # one-off backfill; from here on the rollups are maintained incrementally
+    op.execute(
+        """
+        INSERT INTO template_daily_stats (template_id, day, sent, failed, viewed)
+        SELECT template_id,
+               created_at::date,
+               count(*),
+               0,
+               count(*) FILTER (WHERE viewed)
+        FROM notifications
+        WHERE template_id IS NOT NULL
+        GROUP BY template_id, created_at::date
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("template_daily_stats")
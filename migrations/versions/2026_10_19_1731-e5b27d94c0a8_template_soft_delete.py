@@ -0,0 +1,68 @@
+"""template soft delete
+
+Revision ID: e5b27d94c0a8
+Revises: 9f3a6b1c72e8
+Create Date: 2026-10-19 17:31:12.640893
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b27d94c0a8"
+down_revision: Union[str, None] = "9f3a6b1c72e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("templates", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    op.create_index(
+        op.f("ix_templates_deleted_at"), "templates", ["deleted_at"], unique=False
+    )
+    op.add_column("templates", sa.Column("purge_mode", sa.String(), nullable=True))
+    op.add_column(
+        "templates",
+        sa.Column("purge_processed", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "templates",
+        sa.Column("purge_batches", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column("templates", sa.Column("purge_started_at", sa.DateTime(), nullable=True))
+    op.add_column("templates", sa.Column("purge_updated_at", sa.DateTime(), nullable=True))
+    # the purge job looks notifications up by template in small batches
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f("ix_notifications_template_id"),
+            "notifications",
+            ["template_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # purging a template cascades to its versions, and each of them sets
+        # notifications.template_version_id to NULL; without an index every
+        # version costs a scan of the whole table
+        op.create_index(
+            op.f("ix_notifications_template_version_id"),
+            "notifications",
+            ["template_version_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_notifications_template_version_id"), table_name="notifications")
+    op.drop_index(op.f("ix_notifications_template_id"), table_name="notifications")
+    op.drop_column("templates", "purge_updated_at")
+    op.drop_column("templates", "purge_started_at")
+    op.drop_column("templates", "purge_batches")
+    op.drop_column("templates", "purge_processed")
+    op.drop_column("templates", "purge_mode")
+    op.drop_index(op.f("ix_templates_deleted_at"), table_name="templates")
+    op.drop_column("templates", "deleted_at")
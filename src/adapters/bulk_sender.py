@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+
+from src.adapters.email_sender import SMTPEmailSender
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BulkEmailBatcher:
+    def __init__(self,
+                 email_sender: SMTPEmailSender,
+                 max_recipients: int = 50,
+                 max_batch: int = 500,
+                 linger: float = 0.5):
+        self.email_sender = email_sender
+        self.max_recipients = max_recipients
+        self.max_batch = max_batch
+        self.linger = linger
+        self._pending: defaultdict[str, list[tuple[str, str, str, asyncio.Future]]] = defaultdict(list)
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._in_flight: set[asyncio.Task] = set()
+        metrics.gauge('bulk.pending', lambda: sum(len(p) for p in self._pending.values()))
+
+    async def send_email_html(self, to: str, subject: str, body: str):
+        # waits until the message was handed to the SMTP server, or raises
+        # the error that stopped it
+        domain = to.rpartition('@')[2].lower()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[domain].append((to, subject, body, future))
+        if len(self._pending[domain]) >= self.max_batch:
+            self._flush(domain)
+        elif domain not in self._timers:
+            self._timers[domain] = asyncio.get_running_loop().call_later(self.linger, self._flush, domain)
+        await future
+
+    async def close(self):
+        for domain in list(self._pending):
+            self._flush(domain)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def _flush(self, domain: str):
+        timer = self._timers.pop(domain, None)
+        if timer:
+            timer.cancel()
+        pending = self._pending.pop(domain, None)
+        if not pending:
+            return
+        task = asyncio.create_task(self._send(pending))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, pending: list[tuple[str, str, str, asyncio.Future]]):
+        # identical rendered content becomes one transaction with several RCPT TO
+        groups: dict[bytes, tuple[str, str, list[str]]] = {}
+        for to, subject, body, _ in pending:
+            key = hashlib.sha256(f'{subject}\0{body}'.encode()).digest()
+            groups.setdefault(key, (subject, body, []))[2].append(to)
+        batches = [(recipients[i:i + self.max_recipients], subject, body)
+                   for subject, body, recipients in groups.values()
+                   for i in range(0, len(recipients), self.max_recipients)]
+        metrics.inc('bulk.messages', len(pending))
+        metrics.inc('bulk.transactions', len(batches))
+
+        try:
+            failed = await self.email_sender.send_bulk_html(batches)
+        except Exception as e:
+            logger.error(f"Bulk send of {len(pending)} emails failed: {e}")
+            failed = {to: e for to, _, _, _ in pending}
+        for to, _, _, future in pending:
+            if future.done():
+                continue
+            if to in failed:
+                future.set_exception(failed[to])
+            else:
+                future.set_result(None)
@@ -0,0 +1,19 @@
+from collections import OrderedDict
+
+
+class SeenSet:
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self._items: OrderedDict[str, None] = OrderedDict()
+
+    def add(self, key: str) -> bool:
+        if key in self._items:
+            self._items.move_to_end(key)
+            return False
+        self._items[key] = None
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        return True
+
+    def discard(self, key: str):
+        self._items.pop(key, None)
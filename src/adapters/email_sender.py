@@ -1,12 +1,30 @@
+import asyncio
 import smtplib
+import time
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
 from email.mime.text import MIMEText
 import logging
+from typing import Optional
 
+from src.adapters.rate_limiter import SendRateController
+from src.adapters.render_executor import RenderExecutor, build_html_message
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.exceptions import CircuitOpen
 
 logger = logging.getLogger(__name__)
 
 
+def is_outage(error: Exception) -> bool:
+    # permanent rejections of one message or recipient say nothing about the
+    # server; lost connections, timeouts and transient 4xx replies do
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return True
+
+
 class EmailSender(ABC):
     @abstractmethod
     async def send_email_html(self, to: str, subject: str, body: str):
@@ -18,25 +36,161 @@ class SMTPEmailSender(EmailSender):
                  smtp_server: str,
                  smtp_port: int,
                  smtp_username: str,
-                 smtp_password: str):
+                 smtp_password: str,
+                 max_connections: int = 5,
+                 max_idle_seconds: float = 60,
+                 rate_controller: Optional[SendRateController] = None,
+                 render_executor: Optional[RenderExecutor] = None,
+                 breaker: Optional[CircuitBreaker] = None):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.smtp_username = smtp_username
         self.smtp_password = smtp_password
+        self.max_connections = max_connections
+        self.max_idle_seconds = max_idle_seconds
+        self.rate_controller = rate_controller
+        self.render_executor = render_executor
+        self.breaker = breaker
+        self._idle: list[tuple[smtplib.SMTP_SSL, float]] = []
 
     async def send_email_html(self, to: str, subject: str, body: str):
-        msg = MIMEText(body, 'html')
-        msg['Subject'] = subject
-        msg['From'] = self.smtp_username
-        msg['To'] = to
-
+        msg = await self._build(to, subject, body)
         try:
-            with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port) as server:
-                server.ehlo()
-                server.login(self.smtp_username, self.smtp_password)
-                server.auth_plain()
-                server.send_message(msg)
-                logger.info(f"Email sent to {to} with subject '{subject}'")
+            # the breaker only times the SMTP exchange, not waiting for a rate slot
+            if self.rate_controller:
+                async with self.rate_controller.slot(to):
+                    async with self._guard():
+                        await self._send(msg)
+            else:
+                async with self._guard():
+                    await self._send(msg)
+            logger.info(f"Email sent to {to} with subject '{subject}'")
         except Exception as e:
             logger.error(f"Failed to send email to {to}: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    async def send_bulk_html(self, batches: list[tuple[list[str], str, str]]) -> dict[str, Exception]:
+        # every batch carries identical content for all of its recipients, so it
+        # goes out as one transaction with several RCPT TO; all batches share a
+        # session. Returns the recipients that failed with their errors
+        failed: dict[str, Exception] = {}
+        server = None
+        try:
+            for recipients, subject, body in batches:
+                to = recipients[0] if len(recipients) == 1 else 'undisclosed-recipients:;'
+                msg = await self._build(to, subject, body)
+
+                async def transaction() -> dict:
+                    nonlocal server
+                    async with self._guard():
+                        if server is None:
+                            server, _ = await self._acquire()
+                        server, refused = await self._send_to(server, msg, recipients)
+                        return refused
+
+                try:
+                    if self.rate_controller:
+                        async with self.rate_controller.slot(recipients[0], len(recipients)):
+                            refused = await transaction()
+                    else:
+                        refused = await transaction()
+                    for recipient, error in refused.items():
+                        failed[recipient] = smtplib.SMTPRecipientsRefused({recipient: error})
+                    logger.info(f"Email '{subject}' sent to {len(recipients) - len(refused)} recipients")
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException, CircuitOpen) as e:
+                    # the server rejected the transaction but the session is still usable
+                    logger.error(f"Failed to send email '{subject}' to {len(recipients)} recipients: {e}")
+                    failed.update(dict.fromkeys(recipients, e))
+                except Exception as e:
+                    logger.error(f"Failed to send email '{subject}' to {len(recipients)} recipients: {e}")
+                    failed.update(dict.fromkeys(recipients, e))
+                    if server is not None:
+                        await asyncio.to_thread(self._quit, server)
+                        server = None
+        finally:
+            if server is not None:
+                self._release(server)
+        return failed
+
+    def _guard(self):
+        if self.breaker:
+            return self.breaker.guard(is_outage)
+        return nullcontext()
+
+    async def warm_up(self):
+        server = await asyncio.to_thread(self._connect)
+        self._release(server)
+
+    async def close(self):
+        while self._idle:
+            server, _ = self._idle.pop()
+            await asyncio.to_thread(self._quit, server)
+
+    async def _send(self, msg: MIMEText):
+        server, reused = await self._acquire()
+        try:
+            await asyncio.to_thread(server.send_message, msg)
+        except smtplib.SMTPServerDisconnected:
+            await asyncio.to_thread(self._quit, server)
+            if not reused:
+                raise
+            # the idle connection was dropped by the server, retry on a fresh one
+            server = await asyncio.to_thread(self._connect)
+            try:
+                await asyncio.to_thread(server.send_message, msg)
+            except Exception:
+                await asyncio.to_thread(self._quit, server)
+                raise
+        except Exception:
+            await asyncio.to_thread(self._quit, server)
+            raise
+        self._release(server)
+
+    async def _send_to(self,
+                       server: smtplib.SMTP_SSL,
+                       msg: MIMEText,
+                       recipients: list[str]) -> tuple[smtplib.SMTP_SSL, dict]:
+        try:
+            return server, await asyncio.to_thread(server.send_message, msg, to_addrs=recipients)
+        except smtplib.SMTPServerDisconnected:
+            # most likely an idle connection the server dropped, retry once on a fresh one
+            await asyncio.to_thread(self._quit, server)
+            server = await asyncio.to_thread(self._connect)
+            try:
+                return server, await asyncio.to_thread(server.send_message, msg, to_addrs=recipients)
+            except Exception:
+                await asyncio.to_thread(self._quit, server)
+                raise
+
+    async def _build(self, to: str, subject: str, body: str) -> MIMEText:
+        if self.render_executor:
+            return await self.render_executor.run('mime', build_html_message, self.smtp_username, to, subject, body)
+        return build_html_message(self.smtp_username, to, subject, body)
+
+    async def _acquire(self) -> tuple[smtplib.SMTP_SSL, bool]:
+        now = time.monotonic()
+        while self._idle:
+            server, released_at = self._idle.pop()
+            if now - released_at < self.max_idle_seconds:
+                return server, True
+            await asyncio.to_thread(self._quit, server)
+        return await asyncio.to_thread(self._connect), False
+
+    def _release(self, server: smtplib.SMTP_SSL):
+        if len(self._idle) < self.max_connections:
+            self._idle.append((server, time.monotonic()))
+        else:
+            asyncio.create_task(asyncio.to_thread(self._quit, server))
+
+    def _connect(self) -> smtplib.SMTP_SSL:
+        server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port)
+        server.ehlo()
+        server.login(self.smtp_username, self.smtp_password)
+        return server
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP_SSL):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
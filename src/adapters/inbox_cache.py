@@ -0,0 +1,334 @@
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timezone
+from typing import Optional
+from uuid import UUID
+
+from src.core.config import settings
+from src.schemas.notification import NotificationOut
+
+logger = logging.getLogger(__name__)
+
+# a user's entry is either being loaded ('loading:<token>'), holds the recent
+# feed only ('recent', the unread list was too long to cache) or holds both ('ready')
+LOADING = 'loading:'
+RECENT = 'recent'
+READY = 'ready'
+
+
+def _score(notification: NotificationOut) -> float:
+    return notification.created_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+class InboxCache(ABC):
+    def __init__(self, ttl: int = 300, recent_size: int = 50, max_unread: int = 200):
+        self.ttl = ttl
+        self.recent_size = recent_size
+        self.max_unread = max_unread
+
+    @abstractmethod
+    async def get_recent(self, user_id: UUID, quantity: int) -> Optional[list[NotificationOut]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_unread(self, user_id: UUID) -> Optional[list[NotificationOut]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def begin_load(self, user_id: UUID) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def finish_load(self,
+                          user_id: UUID,
+                          token: str,
+                          recent: list[NotificationOut],
+                          unread: Optional[list[NotificationOut]]):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add(self, notification: NotificationOut, unread: bool):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mark_viewed(self, user_id: UUID, notification_ids: list[UUID]):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def invalidate(self, user_id: UUID):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class _MemoryEntry:
+    def __init__(self, state: str, expires_at: float):
+        self.state = state
+        self.expires_at = expires_at
+        self.items: dict[str, NotificationOut] = {}
+        self.recent: dict[str, float] = {}
+        self.unread: dict[str, float] = {}
+
+
+class MemoryInboxCache(InboxCache):
+    def __init__(self, max_users: int = 10_000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_users = max_users
+        self._entries: OrderedDict[str, _MemoryEntry] = OrderedDict()
+
+    def _entry(self, user_id: UUID) -> Optional[_MemoryEntry]:
+        key = str(user_id)
+        entry = self._entries.get(key)
+        if entry and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _ordered(self, entry: _MemoryEntry, scores: dict[str, float], quantity: int = None) -> list[NotificationOut]:
+        ids = sorted(scores, key=lambda i: (scores[i], i), reverse=True)
+        return [entry.items[i] for i in ids[:quantity]]
+
+    async def get_recent(self, user_id: UUID, quantity: int) -> Optional[list[NotificationOut]]:
+        entry = self._entry(user_id)
+        if not entry or entry.state not in (RECENT, READY):
+            return None
+        return self._ordered(entry, entry.recent, quantity)
+
+    async def get_unread(self, user_id: UUID) -> Optional[list[NotificationOut]]:
+        entry = self._entry(user_id)
+        if not entry or entry.state != READY:
+            return None
+        return self._ordered(entry, entry.unread)
+
+    async def begin_load(self, user_id: UUID) -> Optional[str]:
+        if self._entry(user_id):
+            return None
+        token = LOADING + uuid.uuid4().hex
+        self._entries[str(user_id)] = _MemoryEntry(token, time.monotonic() + 30)
+        if len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+        return token
+
+    async def finish_load(self,
+                          user_id: UUID,
+                          token: str,
+                          recent: list[NotificationOut],
+                          unread: Optional[list[NotificationOut]]):
+        entry = self._entry(user_id)
+        if not entry or entry.state != token:
+            return
+        entry.state = READY if unread is not None else RECENT
+        entry.expires_at = time.monotonic() + self.ttl
+        for notification in recent:
+            entry.items[str(notification.id)] = notification
+            entry.recent[str(notification.id)] = _score(notification)
+        for notification in unread or []:
+            entry.items[str(notification.id)] = notification
+            entry.unread[str(notification.id)] = _score(notification)
+
+    async def add(self, notification: NotificationOut, unread: bool):
+        entry = self._entry(notification.user_id)
+        if not entry:
+            return
+        if entry.state not in (RECENT, READY):
+            # a load in flight may have missed this write, make it fail
+            del self._entries[str(notification.user_id)]
+            return
+        notification_id = str(notification.id)
+        entry.items[notification_id] = notification
+        entry.recent[notification_id] = _score(notification)
+        if unread and entry.state == READY:
+            entry.unread[notification_id] = _score(notification)
+            if len(entry.unread) > self.max_unread:
+                entry.state = RECENT
+                entry.unread.clear()
+        for trimmed in sorted(entry.recent, key=lambda i: (entry.recent[i], i))[:-self.recent_size]:
+            del entry.recent[trimmed]
+        for stale in set(entry.items) - set(entry.recent) - set(entry.unread):
+            del entry.items[stale]
+
+    async def mark_viewed(self, user_id: UUID, notification_ids: list[UUID]):
+        entry = self._entry(user_id)
+        if not entry:
+            return
+        if entry.state not in (RECENT, READY):
+            del self._entries[str(user_id)]
+            return
+        for notification_id in map(str, notification_ids):
+            entry.unread.pop(notification_id, None)
+            if notification_id in entry.recent:
+                entry.items[notification_id] = entry.items[notification_id].model_copy(update={'viewed': True})
+            else:
+                entry.items.pop(notification_id, None)
+
+    async def invalidate(self, user_id: UUID):
+        self._entries.pop(str(user_id), None)
+
+
+_READ = """
+local state = redis.call('GET', KEYS[1])
+if state ~= 'ready' and state ~= 'recent' then return false end
+local ids
+if ARGV[1] == 'recent' then
+    ids = redis.call('ZREVRANGE', KEYS[3], 0, tonumber(ARGV[2]) - 1)
+else
+    if state ~= 'ready' then return false end
+    ids = redis.call('ZREVRANGE', KEYS[4], 0, -1)
+end
+if #ids == 0 then return {} end
+return redis.call('HMGET', KEYS[2], unpack(ids))
+"""
+
+_FINISH_LOAD = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+redis.call('DEL', KEYS[2], KEYS[3], KEYS[4])
+local state = 'recent'
+for _, item in ipairs(cjson.decode(ARGV[3])) do
+    redis.call('ZADD', KEYS[3], item[2], item[1])
+    redis.call('HSET', KEYS[2], item[1], item[3])
+end
+if ARGV[4] ~= '' then
+    state = 'ready'
+    for _, item in ipairs(cjson.decode(ARGV[4])) do
+        redis.call('ZADD', KEYS[4], item[2], item[1])
+        redis.call('HSET', KEYS[2], item[1], item[3])
+    end
+end
+redis.call('SET', KEYS[1], state, 'EX', ARGV[2])
+for i = 2, 4 do redis.call('EXPIRE', KEYS[i], ARGV[2]) end
+return 1
+"""
+
+_ADD = """
+local state = redis.call('GET', KEYS[1])
+if not state then return 0 end
+if state ~= 'ready' and state ~= 'recent' then
+    redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4])
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+if ARGV[4] == '1' and state == 'ready' then
+    redis.call('ZADD', KEYS[4], ARGV[2], ARGV[1])
+    if redis.call('ZCARD', KEYS[4]) > tonumber(ARGV[6]) then
+        redis.call('SET', KEYS[1], 'recent', 'KEEPTTL')
+        redis.call('DEL', KEYS[4])
+    end
+end
+for _, id in ipairs(redis.call('ZRANGE', KEYS[3], 0, -(tonumber(ARGV[5]) + 1))) do
+    redis.call('ZREM', KEYS[3], id)
+    if not redis.call('ZSCORE', KEYS[4], id) then redis.call('HDEL', KEYS[2], id) end
+end
+-- keys created here must not outlive the state key
+local ttl = redis.call('PTTL', KEYS[1])
+for i = 2, 4 do redis.call('PEXPIRE', KEYS[i], ttl) end
+return 1
+"""
+
+_MARK_VIEWED = """
+local state = redis.call('GET', KEYS[1])
+if not state then return 0 end
+if state ~= 'ready' and state ~= 'recent' then
+    redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4])
+    return 0
+end
+for _, id in ipairs(ARGV) do
+    redis.call('ZREM', KEYS[4], id)
+    local payload = redis.call('HGET', KEYS[2], id)
+    if payload and redis.call('ZSCORE', KEYS[3], id) then
+        local item = cjson.decode(payload)
+        item['viewed'] = true
+        redis.call('HSET', KEYS[2], id, cjson.encode(item))
+    elseif payload then
+        redis.call('HDEL', KEYS[2], id)
+    end
+end
+return 1
+"""
+
+
+class RedisInboxCache(InboxCache):
+    def __init__(self, url: str, **kwargs):
+        super().__init__(**kwargs)
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._read = self._redis.register_script(_READ)
+        self._finish_load = self._redis.register_script(_FINISH_LOAD)
+        self._add = self._redis.register_script(_ADD)
+        self._mark_viewed = self._redis.register_script(_MARK_VIEWED)
+
+    @staticmethod
+    def _keys(user_id: UUID) -> list[str]:
+        # the hash tag keeps a user's keys on one cluster slot, as the scripts require
+        prefix = f'inbox:{{{user_id}}}:'
+        return [prefix + 'state', prefix + 'items', prefix + 'recent', prefix + 'unread']
+
+    @staticmethod
+    def _parse(payloads: Optional[list]) -> Optional[list[NotificationOut]]:
+        if payloads is None:
+            return None
+        if not all(payloads):
+            # trimmed between the range read and the lookup; treat as a miss
+            return None
+        return [NotificationOut.model_validate_json(p) for p in payloads]
+
+    @staticmethod
+    def _items(notifications: list[NotificationOut]) -> str:
+        return json.dumps([[str(n.id), _score(n), n.model_dump_json()] for n in notifications])
+
+    async def get_recent(self, user_id: UUID, quantity: int) -> Optional[list[NotificationOut]]:
+        return self._parse(await self._read(keys=self._keys(user_id), args=['recent', quantity]))
+
+    async def get_unread(self, user_id: UUID) -> Optional[list[NotificationOut]]:
+        return self._parse(await self._read(keys=self._keys(user_id), args=['unread', 0]))
+
+    async def begin_load(self, user_id: UUID) -> Optional[str]:
+        token = LOADING + uuid.uuid4().hex
+        if await self._redis.set(self._keys(user_id)[0], token, nx=True, ex=30):
+            return token
+        return None
+
+    async def finish_load(self,
+                          user_id: UUID,
+                          token: str,
+                          recent: list[NotificationOut],
+                          unread: Optional[list[NotificationOut]]):
+        await self._finish_load(keys=self._keys(user_id),
+                                args=[token, self.ttl, self._items(recent),
+                                      self._items(unread) if unread is not None else ''])
+
+    async def add(self, notification: NotificationOut, unread: bool):
+        await self._add(keys=self._keys(notification.user_id),
+                        args=[str(notification.id), _score(notification), notification.model_dump_json(),
+                              '1' if unread else '0', self.recent_size, self.max_unread])
+
+    async def mark_viewed(self, user_id: UUID, notification_ids: list[UUID]):
+        if notification_ids:
+            await self._mark_viewed(keys=self._keys(user_id), args=[str(i) for i in notification_ids])
+
+    async def invalidate(self, user_id: UUID):
+        await self._redis.delete(*self._keys(user_id))
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_inbox_cache() -> Optional[InboxCache]:
+    options = dict(ttl=settings.INBOX_CACHE_TTL,
+                   recent_size=settings.INBOX_CACHE_RECENT_SIZE,
+                   max_unread=settings.INBOX_CACHE_MAX_UNREAD)
+    if settings.INBOX_CACHE == 'redis':
+        return RedisInboxCache(settings.INBOX_CACHE_REDIS_URL, **options)
+    if settings.INBOX_CACHE == 'memory':
+        # only coherent while a single process serves reads and writes, e.g. in tests
+        return MemoryInboxCache(**options)
+    return None
+
+
+inbox_cache = create_inbox_cache()
@@ -1,36 +1,75 @@
 import asyncio
+import logging
 from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.adapters.bulk_sender import BulkEmailBatcher
 from src.adapters.email_sender import EmailSender
+from src.adapters.render_cache import RenderCache
+from src.adapters.render_executor import RenderExecutor, render_email
+from src.adapters.suppression_cache import SuppressionCache
+from src.adapters.template_cache import TemplateVersionCache
 from src.api.deps import get_template_service, get_notification_service
+from src.core.exceptions import CircuitOpen
+from src.core.tracing import tracer
+from src.exceptions.notification import NotificationDuplicate
+from src.exceptions.template import RenderQueueFull
 from src.models.notifications import NotificationType
-from src.schemas.notification import NotificationCreate
-from src.schemas.template import TemplateOut
-from jinja2 import Template as JinjaTemplate
+from src.schemas.notification import NotificationCreate, NotificationOut
+from src.schemas.template import TemplateVersionOut
 
+logger = logging.getLogger(__name__)
+
+# the consumer hands messages failing with these back to the broker
+REDELIVERED_ERRORS = (CircuitOpen, RenderQueueFull)
 
 
 class NotificationProcessorFactory:
     def __init__(self,
                  email_sender: EmailSender,
-                 session_factory):
+                 session_factory,
+                 render_executor: RenderExecutor,
+                 suppression_cache: SuppressionCache = None,
+                 template_cache: TemplateVersionCache = None,
+                 bulk_sender: BulkEmailBatcher = None,
+                 render_cache: RenderCache = None):
         self.email_sender = email_sender
+        self.bulk_sender = bulk_sender
+        self.render_cache = render_cache or RenderCache()
         self.session_factory = session_factory
+        self.render_executor = render_executor
+        self.suppression_cache = suppression_cache
+        self.template_cache = template_cache or TemplateVersionCache()
         self.processors = {
             NotificationType.EMAIL: EmailNotificationProcessor,
             NotificationType.SITE: SiteNotificationProcessor
         }
 
+    def is_suppressed(self, notification: NotificationCreate) -> bool:
+        if not self.suppression_cache:
+            return False
+        return self.suppression_cache.is_suppressed(notification.user_id,
+                                                    notification.type,
+                                                    notification.category)
+
     @asynccontextmanager
     async def get_processor(self, notification_type: NotificationType):
         processor_class = self.processors.get(notification_type)
         async with self.session_factory() as session:
             if not processor_class:
                 raise ValueError(f"No processor found for notification type: {notification_type}")
-            yield processor_class(session, email_sender=self.email_sender)
+            yield processor_class(session,
+                                  email_sender=self.email_sender,
+                                  render_executor=self.render_executor,
+                                  template_cache=self.template_cache,
+                                  bulk_sender=self.bulk_sender,
+                                  render_cache=self.render_cache)
+
+    async def process(self, notification: NotificationCreate):
+        async with self.get_processor(notification.type) as processor:
+            return await processor.process(notification)
 
 
 class NotificationProcessor(ABC):
@@ -43,28 +82,64 @@ class NotificationProcessor(ABC):
 class EmailNotificationProcessor(NotificationProcessor):
     def __init__(self,
                  session: AsyncSession,
-                 email_sender: EmailSender):
+                 email_sender: EmailSender,
+                 render_executor: RenderExecutor,
+                 template_cache: TemplateVersionCache,
+                 bulk_sender: BulkEmailBatcher = None,
+                 render_cache: RenderCache = None):
         self._notification_service = get_notification_service(session)
         self._template_service = get_template_service(session)
         self._email_sender = email_sender
+        self._bulk_sender = bulk_sender
+        self._render_cache = render_cache or RenderCache()
+        self._render_executor = render_executor
+        self._template_cache = template_cache
 
     async def process(self, notification: NotificationCreate):
         if not notification.email:
             raise
         if not notification.template_id:
             raise
-        template: TemplateOut = await self._template_service.get(notification.template_id)
+        # a redelivered message is dropped before any template or render work
+        if notification.idempotency_key and await self._notification_service.is_processed(notification.idempotency_key):
+            raise NotificationDuplicate(f'Notification {notification.idempotency_key} already processed')
+        with tracer.start_as_current_span('template.lookup'):
+            template: TemplateVersionOut = await self._template_cache.get(self._template_service,
+                                                                          notification.template_id)
         email_fields: dict = notification.extra_data
         if not self.__validate_fields(template.required_fields, email_fields):
             raise
         if not email_fields:
             raise
 
-        subject, body = self.__render_email(template, email_fields)
-        inserted_notification = await self._notification_service.create(notification)
-        result = await self._email_sender.send_email_html(notification.email, subject, body)
+        # the idempotency key constraint still stops a redelivery racing this one
+        with tracer.start_as_current_span('notification.insert'):
+            inserted_notification = await self._notification_service.create(notification,
+                                                                            template_version_id=template.id)
+        try:
+            with tracer.start_as_current_span('email.render'):
+                subject, body = await self.__render_email(template, email_fields)
+            sender = self._bulk_sender if notification.bulk and self._bulk_sender else self._email_sender
+            with tracer.start_as_current_span('email.send'):
+                result = await sender.send_email_html(notification.email, subject, body)
+        except REDELIVERED_ERRORS:
+            # the message comes back, and its redelivery would otherwise be
+            # dropped as a duplicate of this row and never sent
+            await self.__settle(self._notification_service.discard, inserted_notification, notification)
+            raise
+        except Exception:
+            # not retried: the row stays in the history, marked as failed
+            await self.__settle(self._notification_service.mark_failed, inserted_notification, notification)
+            raise
         return result
 
+    @staticmethod
+    async def __settle(action, inserted: NotificationOut, notification: NotificationCreate):
+        try:
+            await action(inserted, notification.template_id)
+        except Exception as e:
+            logger.error(f"Failed to settle undelivered notification {inserted.id}: {e}")
+
     def __validate_fields(self, required_fields: str, to_validate: dict) -> bool:
         required_fields_list = required_fields.split()
         to_validate_list = to_validate.keys()
@@ -72,13 +147,12 @@ class EmailNotificationProcessor(NotificationProcessor):
             return True
         return False
 
-    def __render_email(self, template: TemplateOut, data: dict):
-        subject_template = JinjaTemplate(template.subject)
-        body_template = JinjaTemplate(template.body)
-
-        rendered_subject = subject_template.render(**data)
-        rendered_body = body_template.render(**data)
-        return rendered_subject, rendered_body
+    async def __render_email(self, template: TemplateVersionOut, data: dict):
+        # broadcasts send one payload to many recipients, so it is rendered once
+        return await self._render_cache.get(template.id, data,
+                                            lambda: self._render_executor.run('email', render_email,
+                                                                              template.id, template.subject,
+                                                                              template.body, data))
 
 
 class SiteNotificationProcessor(NotificationProcessor):
@@ -88,5 +162,6 @@ class SiteNotificationProcessor(NotificationProcessor):
         self._notification_service = get_notification_service(session)
 
     async def process(self, notification: NotificationCreate):
-        result = await self._notification_service.create(notification)
+        with tracer.start_as_current_span('notification.insert'):
+            result = await self._notification_service.create(notification)
         return result
\ No newline at end of file
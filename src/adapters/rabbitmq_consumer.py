@@ -1,12 +1,25 @@
 import asyncio
-import json
+import time
+from datetime import datetime, timezone
+from functools import partial
 
 import aio_pika
 import logging
 
 from aio_pika import IncomingMessage
+from opentelemetry.trace import SpanKind
 
+from src.adapters.dedup import SeenSet
 from src.adapters.notification_processor import NotificationProcessorFactory
+from src.adapters.scheduler import NotificationScheduler
+from src.core.circuit_breaker import CircuitBreaker, CircuitState
+from src.core.config import RabbitMQLane, settings
+from src.core.exceptions import CircuitOpen
+from src.core.metrics import metrics
+from src.core.profiling import profiler
+from src.core.tracing import extract_context, tracer
+from src.exceptions.notification import NotificationDuplicate
+from src.exceptions.template import RenderQueueFull
 from src.schemas.notification import NotificationCreate
 
 logger = logging.getLogger(__name__)
@@ -15,49 +28,219 @@ logger = logging.getLogger(__name__)
 class RabbitMQConsumer:
     def __init__(self,
                  rabbit_url: str,
-                 queue: str,
-                 notification_processor_factory: NotificationProcessorFactory):
+                 lanes: list[RabbitMQLane],
+                 notification_processor_factory: NotificationProcessorFactory,
+                 seen: SeenSet = None,
+                 scheduler: NotificationScheduler = None,
+                 breakers: list[CircuitBreaker] = None,
+                 ramp_interval: float = 5,
+                 lane_processor_factories: dict[str, NotificationProcessorFactory] = None):
         self.rabbit_url = rabbit_url
-        self.queue = queue
+        self.lanes = lanes
         self.notification_processor_factory = notification_processor_factory
+        # dedicated lanes process with their own pool and SMTP budget
+        self.lane_processor_factories = lane_processor_factories or {}
+        self.seen = seen or SeenSet()
+        self.scheduler = scheduler
+        self.breakers = breakers or []
+        self.ramp_interval = ramp_interval
         self.connection = None
-        self.channel = None
-        self.queue_object = None
+        self.channels = {}
+        self.queue_objects = {}
+        self.consumer_tags = {}
+        self.prefetch = {lane.queue: lane.concurrency for lane in lanes}
+        self.paused = False
+        self._backpressure_task = None
+        self._breaker_opened = asyncio.Event()
+        self._shrunk_at = {lane.queue: 0.0 for lane in lanes}
+        # every lane owns its channel, prefetch window and semaphore, so a
+        # backlog on one lane can never use up the budget reserved for another
+        self.semaphores = {lane.queue: asyncio.Semaphore(lane.concurrency) for lane in lanes}
 
     async def connect(self):
         try:
             self.connection = await aio_pika.connect_robust(self.rabbit_url)
-            self.channel = await self.connection.channel()
-            await self.channel.set_qos(prefetch_count=10)
-            self.queue_object = await self.channel.declare_queue(self.queue, durable=True)
-            logger.info(f"Connected to RabbitMQ and declared queue '{self.queue}'")
+            for lane in self.lanes:
+                channel = await self.connection.channel()
+                # a channel-wide limit can be changed while consuming, which the ramp-up relies on
+                await channel.set_qos(prefetch_count=self.prefetch[lane.queue], global_=True)
+                arguments = {'x-max-priority': lane.max_priority} if lane.max_priority else None
+                self.channels[lane.queue] = channel
+                self.queue_objects[lane.queue] = await channel.declare_queue(lane.queue,
+                                                                             durable=True,
+                                                                             arguments=arguments)
+                logger.info(f"Connected to RabbitMQ and declared queue '{lane.queue}'")
         except Exception as e:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
+            await self.close()
             raise e
 
     async def start_consuming(self):
         await self.connect()
-        await self.queue_object.consume(self.on_message)
+        await self.__consume()
+        if self.breakers and not self._backpressure_task:
+            self._backpressure_task = asyncio.create_task(self.__backpressure())
         logger.info("Started consuming messages")
 
-    async def on_message(self, message: IncomingMessage):
-        async with message.process():
+    async def __consume(self):
+        for lane in self.lanes:
+            self.consumer_tags[lane.queue] = await self.queue_objects[lane.queue].consume(partial(self.on_message, lane))
+
+    def __breaker_open(self) -> bool:
+        # a half-open breaker without probe slots left would reject every
+        # message too, redelivering them in a tight loop, so it counts as open
+        return any(breaker.rejecting for breaker in self.breakers)
+
+    async def __backpressure(self):
+        # while a downstream breaker is open nothing new is taken from the
+        # broker; once it lets probes through consumption resumes one message
+        # at a time per lane and the prefetch doubles every ramp_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._breaker_opened.wait(),
+                                       self.ramp_interval if not self.paused else 1)
+            except asyncio.TimeoutError:
+                pass
+            self._breaker_opened.clear()
             try:
-                body = message.body.decode()
-                data = json.loads(body)
-                notification = NotificationCreate(**data)
-                logger.info(f"Received notification: {notification}")
-                asyncio.create_task(self.__work(notification))
-                logger.info(f"Working with notification: {notification}")
+                if self.__breaker_open():
+                    if not self.paused:
+                        await self.__pause()
+                elif self.paused:
+                    await self.__resume()
+                elif all(breaker.state == CircuitState.CLOSED for breaker in self.breakers):
+                    await self.__ramp_up()
             except Exception as e:
-                print(e)
+                logger.error(f"Failed to apply backpressure: {e}")
+
+    async def __pause(self):
+        self.paused = True
+        for lane in self.lanes:
+            tag = self.consumer_tags.pop(lane.queue, None)
+            if tag:
+                await self.queue_objects[lane.queue].cancel(tag)
+        metrics.inc('consumer.paused')
+        logger.warning("Downstream circuit open, stopped consuming")
+
+    async def __resume(self):
+        for lane in self.lanes:
+            self.prefetch[lane.queue] = 1
+            await self.channels[lane.queue].set_qos(prefetch_count=1, global_=True)
+        await self.__consume()
+        self.paused = False
+        metrics.inc('consumer.resumed')
+        logger.info("Downstream recovering, resumed consuming")
+
+    async def __ramp_up(self):
+        for lane in self.lanes:
+            prefetch = self.prefetch[lane.queue]
+            if prefetch < lane.concurrency:
+                self.prefetch[lane.queue] = min(lane.concurrency, prefetch * 2)
+                await self.channels[lane.queue].set_qos(prefetch_count=self.prefetch[lane.queue], global_=True)
+
+    async def on_message(self, lane: RabbitMQLane, message: IncomingMessage):
+        try:
+            # validating straight from bytes skips building an intermediate dict
+            notification = NotificationCreate.model_validate_json(message.body)
+            if not notification.idempotency_key and message.message_id:
+                notification.idempotency_key = message.message_id
+            logger.info(f"Received notification on '{lane.queue}': {notification}")
+        except Exception as e:
+            logger.error(f"Error decoding message: {e}")
+            await message.reject()
+            return
+        if notification.idempotency_key and not self.seen.add(notification.idempotency_key):
+            logger.info(f"Dropping duplicate notification {notification.idempotency_key}")
+            metrics.inc('consumer.duplicates')
+            await message.ack()
+            return
+        if self.scheduler and self.scheduler.is_deferred(notification):
+            asyncio.create_task(self.__schedule(message, notification))
+            return
+        if self.notification_processor_factory.is_suppressed(notification):
+            logger.info(f"Notification suppressed by user preferences: {notification}")
+            metrics.inc('consumer.suppressed')
+            await message.ack()
+            return
+        asyncio.create_task(self.__work(lane, message, notification))
+
+    async def __work(self, lane: RabbitMQLane, message: IncomingMessage, notification: NotificationCreate):
+        attributes = {'messaging.destination': lane.queue,
+                      'notification.type': notification.type.value}
+        if message.timestamp:
+            timestamp = message.timestamp.replace(tzinfo=message.timestamp.tzinfo or timezone.utc)
+            attributes['messaging.queue_wait_ms'] = (datetime.now(timezone.utc) - timestamp).total_seconds() * 1000
+        with tracer.start_as_current_span('notification.consume',
+                                          context=extract_context(message.headers),
+                                          kind=SpanKind.CONSUMER,
+                                          attributes=attributes):
+            await self.__process(lane, message, notification)
+
+    async def __process(self, lane: RabbitMQLane, message: IncomingMessage, notification: NotificationCreate):
+        async with self.semaphores[lane.queue]:
+            try:
+                # ack only once processing is done, so the prefetch window
+                # bounds the work in flight for this lane
+                async with message.process(requeue=False, ignore_processed=True):
+                    if self.__breaker_open():
+                        # already prefetched but nothing downstream can take it; hand it back
+                        await self.__requeue(message, notification)
+                        return
+                    try:
+                        processor_factory = self.lane_processor_factories.get(lane.queue,
+                                                                             self.notification_processor_factory)
+                        if profiler.sampled(settings.PROFILING_CONSUMER_SAMPLE_RATE):
+                            with profiler.profile(f'consumer_{lane.queue}_{notification.type.value}'):
+                                await processor_factory.process(notification)
+                        else:
+                            await processor_factory.process(notification)
+                    except NotificationDuplicate as e:
+                        logger.info(f"Dropping duplicate notification: {e}")
+                        metrics.inc('consumer.duplicates')
+                    except CircuitOpen:
+                        await self.__requeue(message, notification)
+                    except RenderQueueFull:
+                        await self.__shrink(lane)
+                        await self.__requeue(message, notification)
+            except Exception as e:
+                if notification.idempotency_key:
+                    self.seen.discard(notification.idempotency_key)
                 logger.error(f"Error processing message: {e}")
 
-    async def __work(self, notification: NotificationCreate):
-        async with self.notification_processor_factory.get_processor(notification.type) as processor:
-            await processor.process(notification)
+    async def __requeue(self, message: IncomingMessage, notification: NotificationCreate):
+        if notification.idempotency_key:
+            self.seen.discard(notification.idempotency_key)
+        metrics.inc('consumer.requeued')
+        self._breaker_opened.set()
+        await message.nack(requeue=True)
+
+    async def __shrink(self, lane: RabbitMQLane):
+        # the renderers are saturated: halve the lane's prefetch, at most once
+        # per ramp interval, and let the ramp-up grow it back
+        now = time.monotonic()
+        if now - self._shrunk_at[lane.queue] < self.ramp_interval:
+            return
+        self._shrunk_at[lane.queue] = now
+        prefetch = max(1, self.prefetch[lane.queue] // 2)
+        if prefetch < self.prefetch[lane.queue]:
+            self.prefetch[lane.queue] = prefetch
+            await self.channels[lane.queue].set_qos(prefetch_count=prefetch, global_=True)
+            metrics.inc(f'consumer.{lane.queue}.shrunk')
+
+    async def __schedule(self, message: IncomingMessage, notification: NotificationCreate):
+        try:
+            async with message.process(requeue=True, ignore_processed=True):
+                await self.scheduler.schedule(notification)
+        except Exception as e:
+            if notification.idempotency_key:
+                self.seen.discard(notification.idempotency_key)
+            logger.error(f"Error scheduling message: {e}")
 
     async def close(self):
+        if self._backpressure_task:
+            self._backpressure_task.cancel()
+            self._backpressure_task = None
         if self.connection:
             await self.connection.close()
+            self.connection = None
             logger.info("RabbitMQ connection closed")
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import smtplib
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AIMDLimiter:
+    def __init__(self,
+                 maximum: int,
+                 minimum: int = 1,
+                 decrease_factor: float = 0.5,
+                 latency_target: Optional[float] = None):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.limit = float(maximum)
+        self._decreased_at = 0.0
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self, latency: float):
+        if self.latency_target and latency > self.latency_target:
+            self.on_throttle(time.monotonic() - latency)
+            return
+        # grows by roughly one slot per window of successful sends
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttle(self, started_at: Optional[float] = None):
+        # sends that were already in flight when the limit last went down
+        # report the same congestion, so one throttling event backs off once
+        if started_at is not None and started_at < self._decreased_at:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        self._decreased_at = time.monotonic()
+        logger.warning(f"SMTP concurrency limit decreased to {int(self.limit)}")
+
+
+class SendRateController:
+    THROTTLE_CODES = {421, 450, 451, 452}
+
+    def __init__(self,
+                 concurrency: AIMDLimiter,
+                 rate_per_minute: Optional[float] = None,
+                 burst: int = 10,
+                 domain_rate_per_minute: Optional[float] = None,
+                 domain_burst: int = 5,
+                 max_domains: int = 10_000,
+                 name: str = 'smtp'):
+        self._concurrency = concurrency
+        self._bucket = TokenBucket(rate_per_minute, burst) if rate_per_minute else None
+        self._domain_rate_per_minute = domain_rate_per_minute
+        self._domain_burst = domain_burst
+        self._max_domains = max_domains
+        self._domain_buckets: dict[str, TokenBucket] = {}
+        metrics.gauge(f'{name}.concurrency_limit', lambda: int(self._concurrency.limit))
+
+    def _domain_bucket(self, recipient: str) -> Optional[TokenBucket]:
+        if not self._domain_rate_per_minute:
+            return None
+        domain = recipient.rpartition('@')[2].lower()
+        bucket = self._domain_buckets.get(domain)
+        if bucket is None:
+            if len(self._domain_buckets) >= self._max_domains:
+                self._domain_buckets.pop(next(iter(self._domain_buckets)))
+            bucket = TokenBucket(self._domain_rate_per_minute, self._domain_burst)
+            self._domain_buckets[domain] = bucket
+        return bucket
+
+    def _is_throttled(self, error: Exception) -> bool:
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code in self.THROTTLE_CODES
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return any(code in self.THROTTLE_CODES for code, _ in error.recipients.values())
+        # the sender already retried a dropped idle connection on a fresh one,
+        # so a disconnect getting here is the server hanging up on new
+        # sessions, the way it does after a 421 greeting
+        return isinstance(error, smtplib.SMTPServerDisconnected)
+
+    @asynccontextmanager
+    async def slot(self, recipient: str, count: int = 1):
+        # count is the number of recipients sharing recipient's domain in one transaction
+        for bucket in (self._bucket, self._domain_bucket(recipient)):
+            if bucket:
+                for _ in range(count):
+                    await bucket.acquire()
+        await self._concurrency.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if self._is_throttled(e):
+                metrics.inc('smtp.throttled')
+                self._concurrency.on_throttle(start)
+            raise
+        else:
+            latency = time.monotonic() - start
+            metrics.observe('smtp.send', latency)
+            self._concurrency.on_success(latency)
+        finally:
+            await self._concurrency.release()
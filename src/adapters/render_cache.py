@@ -0,0 +1,77 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+from src.core.metrics import metrics
+
+
+def data_hash(data: dict) -> Optional[bytes]:
+    try:
+        canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(canonical.encode()).digest()
+
+
+class RenderCache:
+    def __init__(self, ttl: float = 60, max_size: int = 1000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._rendered: OrderedDict[tuple[UUID, bytes], tuple[tuple[str, str], float]] = OrderedDict()
+        # identical payloads arriving together wait for one render instead of each starting their own
+        self._in_flight: dict[tuple[UUID, bytes], asyncio.Future] = {}
+        metrics.gauge('render_cache.size', lambda: len(self._rendered))
+
+    async def get(self,
+                  version_id: UUID,
+                  data: dict,
+                  render: Callable[[], Awaitable[tuple[str, str]]]) -> tuple[str, str]:
+        digest = data_hash(data)
+        if digest is None:
+            metrics.inc('render_cache.uncacheable')
+            return await render()
+        key = (version_id, digest)
+
+        cached = self._rendered.get(key)
+        if cached is not None:
+            if time.monotonic() - cached[1] < self.ttl:
+                self._rendered.move_to_end(key)
+                metrics.inc('render_cache.hits')
+                return cached[0]
+            del self._rendered[key]
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            metrics.inc('render_cache.hits')
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # the render we waited on was cancelled, not us
+                return await render()
+
+        metrics.inc('render_cache.misses')
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await render()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # nobody else may be waiting; retrieving it keeps asyncio from logging it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            self._rendered[key] = (result, time.monotonic())
+            if len(self._rendered) > self.max_size:
+                self._rendered.popitem(last=False)
+            return result
+        finally:
+            del self._in_flight[key]
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from email.mime.text import MIMEText
+from collections import OrderedDict
+from typing import Callable
+from uuid import UUID
+
+from jinja2 import Template as JinjaTemplate
+
+from src.core.metrics import metrics
+from src.exceptions.template import RenderQueueFull
+
+
+_compiled: OrderedDict[UUID, tuple[JinjaTemplate, JinjaTemplate]] = OrderedDict()
+
+
+def _compile(version_id: UUID, subject: str, body: str) -> tuple[JinjaTemplate, JinjaTemplate]:
+    # jinja templates can't be pickled, so every worker compiles a template
+    # version once and keeps it; versions are immutable so nothing goes stale
+    compiled = _compiled.get(version_id)
+    if compiled is None:
+        compiled = JinjaTemplate(subject), JinjaTemplate(body)
+        _compiled[version_id] = compiled
+        if len(_compiled) > 512:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def render_email(version_id: UUID, subject: str, body: str, data: dict) -> tuple[str, str]:
+    subject_template, body_template = _compile(version_id, subject, body)
+    return subject_template.render(**data), body_template.render(**data)
+
+
+def build_html_message(sender: str, to: str, subject: str, body: str) -> MIMEText:
+    msg = MIMEText(body, 'html')
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = to
+    return msg
+
+
+def _timed(func: Callable, *args):
+    return time.time(), func(*args)
+
+
+class RenderExecutor:
+    def __init__(self,
+                 kind: str = 'thread',
+                 max_workers: int = 4,
+                 max_pending: int = 100,
+                 reject_when_full: bool = False):
+        self.kind = kind
+        self.reject_when_full = reject_when_full
+        self._executor: Executor = (ProcessPoolExecutor(max_workers=max_workers) if kind == 'process'
+                                    else ThreadPoolExecutor(max_workers=max_workers,
+                                                            thread_name_prefix='render'))
+        self._slots = asyncio.Semaphore(max_workers + max_pending)
+        self._in_flight = 0
+        metrics.gauge('render.in_flight', lambda: self._in_flight)
+
+    async def run(self, name: str, func: Callable, *args):
+        if self.reject_when_full and self._slots.locked():
+            metrics.inc(f'render.{name}.rejected')
+            raise RenderQueueFull('Render queue is full')
+        submitted_at = time.time()
+        async with self._slots:
+            self._in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                started_at, result = await loop.run_in_executor(self._executor, _timed, func, *args)
+            finally:
+                self._in_flight -= 1
+        finished_at = time.time()
+        metrics.observe(f'render.{name}.queue_wait', started_at - submitted_at)
+        metrics.observe(f'render.{name}.run', finished_at - started_at)
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
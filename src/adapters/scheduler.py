@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from src.adapters.notification_processor import NotificationProcessorFactory
+from src.core.dates import to_utc
+from src.core.metrics import metrics
+from src.exceptions.notification import NotificationDuplicate
+from src.models.scheduled import ScheduledNotification
+from src.repositories.scheduled_repository import SqlaScheduledNotificationRepository
+from src.schemas.notification import NotificationCreate
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationScheduler:
+    def __init__(self,
+                 session_factory,
+                 notification_processor_factory: NotificationProcessorFactory,
+                 horizon: timedelta = timedelta(minutes=5),
+                 poll_interval: float = 30,
+                 batch_size: int = 1000,
+                 concurrency: int = 5,
+                 max_held: int = 10_000):
+        self.session_factory = session_factory
+        self.notification_processor_factory = notification_processor_factory
+        self.horizon = horizon
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_held = max_held
+        # a due batch shares the consumer's connection pool, so only a few
+        # notifications are processed at once instead of the whole batch
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # only items due within the horizon are held in memory, ordered by due time
+        self._heap: list[tuple[datetime, int, UUID, NotificationCreate]] = []
+        # ids in the heap or being released; their claims are refreshed on
+        # every load so no worker, this one included, takes them over
+        self._held: set[UUID] = set()
+        # released items whose rows could not be deleted yet; they stay held
+        # until they are, or another worker would send them again
+        self._undeleted: list[UUID] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        metrics.gauge('scheduler.in_memory', lambda: len(self._heap))
+
+    def is_deferred(self, notification: NotificationCreate) -> bool:
+        return bool(notification.send_at) and to_utc(notification.send_at) > datetime.utcnow()
+
+    async def schedule(self, notification: NotificationCreate):
+        due_at = to_utc(notification.send_at)
+        # items inside the horizon are claimed straight away instead of
+        # waiting for the next poll
+        claimed = due_at <= datetime.utcnow() + self.horizon
+        scheduled = ScheduledNotification(due_at=due_at,
+                                          payload=notification.model_dump(mode='json'),
+                                          claimed_at=datetime.utcnow() if claimed else None)
+        async with self.session_factory() as session:
+            await SqlaScheduledNotificationRepository(session).create(scheduled)
+        metrics.inc('scheduler.scheduled')
+        if claimed:
+            self._push(scheduled.id, due_at, notification)
+
+    async def run(self):
+        await asyncio.gather(self._load_loop(), self._release_loop())
+
+    async def load(self):
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            repository = SqlaScheduledNotificationRepository(session)
+            if self._undeleted:
+                undeleted, self._undeleted = self._undeleted, []
+                try:
+                    await repository.delete_many(undeleted)
+                except Exception:
+                    self._undeleted.extend(undeleted)
+                    raise
+                self._held.difference_update(undeleted)
+            held = list(self._held)
+            for i in range(0, len(held), self.batch_size):
+                await repository.refresh_claims(held[i:i + self.batch_size])
+            # no more is claimed than can be held, the rest stays in the
+            # table for whichever worker has room first
+            while len(self._held) < self.max_held:
+                limit = min(self.batch_size, self.max_held - len(self._held))
+                claimed = await repository.claim_due(due_before=now + self.horizon,
+                                                     stale_before=now - 2 * self.horizon,
+                                                     limit=limit)
+                for scheduled in claimed:
+                    if scheduled.id not in self._held:
+                        self._push(scheduled.id, scheduled.due_at,
+                                   NotificationCreate.model_validate(scheduled.payload))
+                if len(claimed) < limit:
+                    break
+
+    def _push(self, scheduled_id: UUID, due_at: datetime, notification: NotificationCreate):
+        self._held.add(scheduled_id)
+        heapq.heappush(self._heap, (due_at, next(self._sequence), scheduled_id, notification))
+        if self._heap[0][2] == scheduled_id:
+            self._wakeup.set()
+
+    async def _load_loop(self):
+        while True:
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Failed to load scheduled notifications: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _release_loop(self):
+        while True:
+            now = datetime.utcnow()
+            due = []
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self._heap))
+            if due:
+                await self._release(due)
+                continue
+
+            self._wakeup.clear()
+            timeout = (self._heap[0][0] - now).total_seconds() if self._heap else self.poll_interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _release(self, due: list[tuple[datetime, int, UUID, NotificationCreate]]):
+        dispatched = await asyncio.gather(*(self._dispatch(notification) for _, _, _, notification in due))
+        released = [item[2] for item, ok in zip(due, dispatched) if ok]
+        self._held.difference_update(item[2] for item, ok in zip(due, dispatched) if not ok)
+        if released:
+            try:
+                async with self.session_factory() as session:
+                    await SqlaScheduledNotificationRepository(session).delete_many(released)
+                self._held.difference_update(released)
+            except Exception as e:
+                logger.error(f"Failed to remove released scheduled notifications, retrying on the next load: {e}")
+                self._undeleted.extend(released)
+        failed = len(due) - len(released)
+        if failed:
+            # the failed items stay claimed, so a load takes them over again
+            # once the claim goes stale instead of them being lost
+            logger.warning(f"{failed} scheduled notifications failed, retrying them later")
+            metrics.inc('scheduler.failed', failed)
+        metrics.inc('scheduler.released', len(released))
+
+    async def _dispatch(self, notification: NotificationCreate) -> bool:
+        async with self._semaphore:
+            try:
+                if self.notification_processor_factory.is_suppressed(notification):
+                    metrics.inc('scheduler.suppressed')
+                    return True
+                await self.notification_processor_factory.process(notification)
+            except NotificationDuplicate:
+                return True
+            except Exception as e:
+                logger.error(f"Error processing scheduled notification: {e}")
+                return False
+        return True
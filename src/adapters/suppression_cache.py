@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+from src.models.notifications import NotificationType
+from src.repositories.preference_repository import SqlaPreferenceRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SuppressionCache:
+    def __init__(self,
+                 session_factory,
+                 refresh_interval: float = 5,
+                 batch_size: int = 5000,
+                 overlap: timedelta = timedelta(seconds=30)):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        # rows committed late with an older updated_at are picked up by
+        # re-reading a short window behind the watermark
+        self.overlap = overlap
+        self._suppressed: set[tuple[str, NotificationType, str]] = set()
+        self._watermark: Optional[datetime] = None
+
+    def is_suppressed(self, user_id: UUID, channel: NotificationType, category: Optional[str]) -> bool:
+        if not self._suppressed:
+            return False
+        user_id = str(user_id)
+        if (user_id, channel, '') in self._suppressed:
+            return True
+        return bool(category) and (user_id, channel, category) in self._suppressed
+
+    async def refresh(self):
+        after = (self._watermark - self.overlap, UUID(int=0)) if self._watermark else None
+        async with self.session_factory() as session:
+            repository = SqlaPreferenceRepository(session)
+            while True:
+                preferences = await repository.get_updated_after(after, self.batch_size)
+                for preference in preferences:
+                    key = (str(preference.user_id), preference.channel, preference.category)
+                    if preference.enabled:
+                        self._suppressed.discard(key)
+                    else:
+                        self._suppressed.add(key)
+                if preferences:
+                    last = preferences[-1]
+                    after = (last.updated_at, last.id)
+                    if not self._watermark or last.updated_at > self._watermark:
+                        self._watermark = last.updated_at
+                if len(preferences) < self.batch_size:
+                    break
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh suppression cache: {e}")
@@ -0,0 +1,39 @@
+import time
+from collections import OrderedDict
+from uuid import UUID
+
+from src.core.metrics import metrics
+from src.schemas.template import TemplateVersionOut
+from src.services.template_service import TemplateService
+
+
+class TemplateVersionCache:
+    def __init__(self, pointer_ttl: float = 5, max_versions: int = 1000):
+        self.pointer_ttl = pointer_ttl
+        self.max_versions = max_versions
+        self._pointers: dict[UUID, tuple[UUID, float]] = {}
+        # versions never change, so entries are only evicted for size
+        self._versions: OrderedDict[UUID, TemplateVersionOut] = OrderedDict()
+
+    async def get(self, template_service: TemplateService, template_id: UUID) -> TemplateVersionOut:
+        version_id = await self._current_version_id(template_service, template_id)
+        version = self._versions.get(version_id)
+        if version is not None:
+            self._versions.move_to_end(version_id)
+            metrics.inc('template_cache.hits')
+            return version
+
+        metrics.inc('template_cache.misses')
+        version = await template_service.get_version(version_id)
+        self._versions[version_id] = version
+        if len(self._versions) > self.max_versions:
+            self._versions.popitem(last=False)
+        return version
+
+    async def _current_version_id(self, template_service: TemplateService, template_id: UUID) -> UUID:
+        pointer = self._pointers.get(template_id)
+        if pointer and time.monotonic() - pointer[1] < self.pointer_ttl:
+            return pointer[0]
+        version_id = await template_service.get_current_version_id(template_id)
+        self._pointers[template_id] = (version_id, time.monotonic())
+        return version_id
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from uuid import UUID
+
+from src.adapters.inbox_cache import inbox_cache
+from src.core.metrics import metrics
+from src.repositories.cached_notification_repository import CachedNotificationRepository
+from src.repositories.notification_repository import NotificationRepository, SqlaNotificationRepository
+from src.repositories.template_repository import SqlaTemplateRepository
+
+logger = logging.getLogger(__name__)
+
+
+class TemplatePurger:
+    def __init__(self):
+        self._pending = 0
+        metrics.gauge('template_purge.pending', lambda: self._pending)
+
+    async def run(self,
+                  session_factory,
+                  mode: str = 'detach',
+                  batch_size: int = 1000,
+                  pause: float = 0.5,
+                  poll_interval: float = 60):
+        while True:
+            try:
+                await self.purge_deleted(session_factory, mode, batch_size, pause)
+            except Exception as e:
+                logger.error(f"Template purge failed: {e}")
+            await asyncio.sleep(poll_interval)
+
+    async def purge_deleted(self, session_factory, mode: str, batch_size: int, pause: float):
+        async with session_factory() as session:
+            deleted = await SqlaTemplateRepository(session).get_deleted()
+        self._pending = len(deleted)
+        for template in deleted:
+            try:
+                await self._purge(session_factory, template.id, mode, batch_size, pause)
+            except Exception as e:
+                # e.g. a row inserted or skipped while locked still references it; the next round retries
+                logger.warning(f"Template {template.id} not purged yet: {e}")
+
+    async def _purge(self, session_factory, template_id: UUID, mode: str, batch_size: int, pause: float):
+        action = 'deleted' if mode == 'delete' else 'detached'
+        total = 0
+        # every batch is its own short transaction, and the pause between them
+        # leaves room for regular traffic on the notifications table
+        while True:
+            async with session_factory() as session:
+                repository = self._notification_repository(session)
+                if mode == 'delete':
+                    processed = len(await repository.delete_by_template(template_id, batch_size))
+                else:
+                    processed = await repository.detach_template(template_id, batch_size)
+                # progress is kept on the template row, where every worker's batches add up
+                await SqlaTemplateRepository(session).record_purge_batch(template_id, mode, processed)
+            total += processed
+            metrics.inc(f'template_purge.{action}', processed)
+            if processed < batch_size:
+                break
+            await asyncio.sleep(pause)
+
+        async with session_factory() as session:
+            purged = await SqlaTemplateRepository(session).purge(template_id)
+        if purged:
+            logger.info(f"Template {template_id} purged, {total} notifications {action} by this worker")
+
+    @staticmethod
+    def _notification_repository(session) -> NotificationRepository:
+        repository = SqlaNotificationRepository(session)
+        if inbox_cache:
+            # deleted notifications must not be served from cached inboxes
+            repository = CachedNotificationRepository(repository, inbox_cache)
+        return repository
+
+
+template_purger = TemplatePurger()
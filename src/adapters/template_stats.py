@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Optional
+from uuid import UUID
+
+from src.core.metrics import metrics
+from src.repositories.stats_repository import SqlaTemplateStatsRepository
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateStatsRecorder:
+    def __init__(self):
+        # deltas are summed in memory and written as one upsert per flush,
+        # so a burst of sends costs a single statement per (template, day)
+        self._pending: defaultdict[tuple[UUID, date], Counter] = defaultdict(Counter)
+        metrics.gauge('stats.pending', lambda: len(self._pending))
+
+    def record(self, template_id: Optional[UUID], day: date, **deltas: int):
+        if template_id:
+            self._pending[(template_id, day)].update(deltas)
+
+    async def flush(self, session_factory):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, defaultdict(Counter)
+        # a stable key order keeps concurrent flushes from deadlocking
+        rows = [{'template_id': template_id, 'day': day,
+                 'sent': counts['sent'], 'failed': counts['failed'], 'viewed': counts['viewed']}
+                for (template_id, day), counts in sorted(pending.items(), key=lambda item: (str(item[0][0]), item[0][1]))]
+        try:
+            async with session_factory() as session:
+                written = await SqlaTemplateStatsRepository(session).increment_many(rows)
+        except Exception as e:
+            for key, counts in pending.items():
+                self._pending[key].update(counts)
+            logger.error(f"Failed to flush template stats: {e}")
+            return
+        metrics.inc('stats.flushed_rows', written)
+        if written < len(rows):
+            logger.info(f"Dropped {len(rows) - written} template stats rows of purged templates")
+
+    async def run(self, session_factory, interval: float = 5):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush(session_factory)
+
+
+template_stats = TemplateStatsRecorder()
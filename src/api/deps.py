@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from uuid import UUID
 
 from fastapi import Depends, HTTPException
@@ -5,22 +6,29 @@ from fastapi.security import OAuth2AuthorizationCodeBearer, HTTPBearer, HTTPAuth
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from src.core.exceptions import InvalidToken
+from src.adapters.inbox_cache import inbox_cache
+from src.core.exceptions import InvalidToken, PublicKeyUnavailable
 from src.core.jwt_decoder import JWTDecoder
-from src.db.database import AsyncSessionFactory
+from src.db.routing import session_router, TEMPLATES_KEY
 from src.exceptions.base import CloudsellNotifyException
 from src.repositories.admin_repository import SqlaAdminRepository
+from src.repositories.cached_notification_repository import CachedNotificationRepository
 from src.repositories.notification_repository import SqlaNotificationRepository
+from src.repositories.preference_repository import SqlaPreferenceRepository
+from src.repositories.stats_repository import SqlaTemplateStatsRepository
 from src.repositories.template_repository import SqlaTemplateRepository
 from src.services.admin_service import AdminService
 from src.services.notification_service import NotificationService
+from src.services.preference_service import PreferenceService
+from src.services.stats_service import TemplateStatsService
 from src.services.template_service import TemplateService
 
 http_bearer = HTTPBearer()
 
 
-async def get_session() -> AsyncSession:
-    async with AsyncSessionFactory() as session:
+@asynccontextmanager
+async def session_scope(session_factory):
+    async with session_factory() as session:
         try:
             yield session
             await session.commit()
@@ -31,18 +39,31 @@ async def get_session() -> AsyncSession:
             await session.close()
 
 
+async def get_session() -> AsyncSession:
+    async with session_scope(session_router.for_write()) as session:
+        yield session
+
+
 def get_admin_service(session: AsyncSession = Depends(get_session)) -> AdminService:
     repository = SqlaAdminRepository(session)
     return AdminService(repository)
 
 def get_notification_service(session: AsyncSession = Depends(get_session)) -> NotificationService:
     repository = SqlaNotificationRepository(session)
+    if inbox_cache:
+        # the cache is only ever filled from the primary
+        primary = session_router.for_write() if session.info.get('replica') else None
+        repository = CachedNotificationRepository(repository, inbox_cache, primary)
     return NotificationService(repository)
 
 def get_template_service(session: AsyncSession = Depends(get_session)) -> TemplateService:
     repository = SqlaTemplateRepository(session)
     return TemplateService(repository)
 
+def get_preference_service(session: AsyncSession = Depends(get_session)) -> PreferenceService:
+    repository = SqlaPreferenceRepository(session)
+    return PreferenceService(repository)
+
 
 async def get_user_id(credentials: HTTPAuthorizationCredentials = Depends(http_bearer)) -> UUID:
     token = credentials.credentials
@@ -52,12 +73,14 @@ async def get_user_id(credentials: HTTPAuthorizationCredentials = Depends(http_b
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        token_data = JWTDecoder.decode(token)
+        token_data = await JWTDecoder.decode(token)
         if not token_data.get('sub'):
             raise credentials_exception
         return token_data["sub"]
     except InvalidToken as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    except PublicKeyUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
 
 
 async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
@@ -67,4 +90,29 @@ async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(
         admin = await admin_service.verify_admin(token)
         return admin
     except CloudsellNotifyException as e:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except PublicKeyUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+async def get_read_session(user_id: UUID = Depends(get_user_id)) -> AsyncSession:
+    async with session_scope(session_router.for_read(user_id)) as session:
+        yield session
+
+
+async def get_template_read_session() -> AsyncSession:
+    async with session_scope(session_router.for_read(TEMPLATES_KEY)) as session:
+        yield session
+
+
+def get_read_notification_service(session: AsyncSession = Depends(get_read_session)) -> NotificationService:
+    return get_notification_service(session)
+
+
+def get_read_template_service(session: AsyncSession = Depends(get_template_read_session)) -> TemplateService:
+    return get_template_service(session)
+
+
+def get_read_template_stats_service(session: AsyncSession = Depends(get_template_read_session)) -> TemplateStatsService:
+    repository = SqlaTemplateStatsRepository(session)
+    return TemplateStatsService(repository)
@@ -0,0 +1,93 @@
+import time
+
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.api.deps import session_scope
+from src.core.config import settings
+from src.core.jwt_decoder import JWTDecoder
+from src.core.profiling import profiler
+from src.core.tracing import extract_context, tracer
+from src.db.routing import session_router
+from src.repositories.admin_repository import SqlaAdminRepository
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        context = extract_context(dict(Headers(scope=scope)))
+        with tracer.start_as_current_span(f"{scope['method']} {scope['path']}",
+                                          context=context,
+                                          kind=SpanKind.SERVER,
+                                          attributes={'http.method': scope['method'],
+                                                      'http.target': scope['path']}) as span:
+            async def traced_send(message: Message):
+                if message['type'] == 'http.response.start':
+                    span.set_attribute('http.status_code', message['status'])
+                    if message['status'] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            await self.app(scope, receive, traced_send)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, verdict_ttl: float = 60, max_verdicts: int = 10_000):
+        self.app = app
+        self.verdict_ttl = verdict_ttl
+        self.max_verdicts = max_verdicts
+        self._verdicts: dict[str, tuple[bool, float]] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or not await self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        with profiler.profile(f"http_{scope['method']}_{scope['path']}"):
+            await self.app(scope, receive, send)
+
+    async def _should_profile(self, scope: Scope) -> bool:
+        if profiler.sampled(settings.PROFILING_HTTP_SAMPLE_RATE):
+            return True
+        headers = Headers(scope=scope)
+        if not headers.get(settings.PROFILING_HEADER):
+            return False
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return False
+        return await self._is_admin(token)
+
+    async def _is_admin(self, token: str) -> bool:
+        # the signature and the role claim are checked locally, so a bogus or
+        # non-admin token never reaches the database
+        try:
+            payload = await JWTDecoder.decode(token)
+        except Exception:
+            return False
+        user_id = payload.get('sub')
+        if not user_id:
+            return False
+        if settings.PROFILING_ADMIN_ROLE:
+            roles = payload.get('roles') or payload.get('role')
+            roles = [roles] if isinstance(roles, str) else roles or []
+            if settings.PROFILING_ADMIN_ROLE not in roles:
+                return False
+
+        cached = self._verdicts.get(user_id)
+        if cached and time.monotonic() - cached[1] < self.verdict_ttl:
+            return cached[0]
+        try:
+            async with session_scope(session_router.for_read()) as session:
+                verdict = await SqlaAdminRepository(session).get(user_id) is not None
+        except Exception:
+            return False
+        if len(self._verdicts) >= self.max_verdicts:
+            self._verdicts.pop(next(iter(self._verdicts)))
+        self._verdicts[user_id] = (verdict, time.monotonic())
+        return verdict
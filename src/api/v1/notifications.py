@@ -1,26 +1,51 @@
+import json
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette import status
+from starlette.responses import StreamingResponse
 
-from src.api.deps import get_user_id, get_notification_service
+from src.api.deps import get_user_id, get_notification_service, get_read_notification_service, session_scope
+from src.core.config import settings
+from src.core.dates import to_utc
+from src.db.routing import session_router
+from src.models.notifications import NotificationType
 from src.schemas.notification import NotificationOut
 from src.services.notification_service import NotificationService
 
 router = APIRouter(prefix='/notifications', tags=['Notifications'])
 
+
+def extra_data_filter(extra_data: Optional[str] = Query(None,
+                                                        description='JSON object the extra_data must contain, '
+                                                                    'e.g. {"order_id": 42}')) -> Optional[dict]:
+    if not extra_data:
+        return None
+    try:
+        result = json.loads(extra_data)
+    except ValueError:
+        result = None
+    if not isinstance(result, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='extra_data must be a JSON object')
+    return result
+
+
 @router.get('/unread', response_model=list[NotificationOut])
-async def get_unread_notifications(user_id: UUID = Depends(get_user_id),
-                                   notification_service: NotificationService = Depends(get_notification_service)):
-    result = await notification_service.get_unread(user_id)
+async def get_unread_notifications(extra_data: Optional[dict] = Depends(extra_data_filter),
+                                   user_id: UUID = Depends(get_user_id),
+                                   notification_service: NotificationService = Depends(get_read_notification_service)):
+    result = await notification_service.get_unread(user_id, extra_data)
     return result
 
 
 @router.get('/', response_model=list[NotificationOut])
 async def get_last(quantity: Optional[int] = 15,
+                   extra_data: Optional[dict] = Depends(extra_data_filter),
                    user_id: UUID = Depends(get_user_id),
-                   notification_service: NotificationService = Depends(get_notification_service)):
-    result = await notification_service.get_last(user_id, quantity)
+                   notification_service: NotificationService = Depends(get_read_notification_service)):
+    result = await notification_service.get_last(user_id, quantity, extra_data)
     return result
 
 
@@ -31,4 +56,31 @@ async def mark_viewed(notification_ids: list[UUID],
     result = await notification_service.set_viewed_many(user_id, notification_ids)
     if result:
         return {'status': 'ok'}
-    raise HTTPException(status_code=400, detail='Something went wrong')
\ No newline at end of file
+    raise HTTPException(status_code=400, detail='Something went wrong')
+
+
+@router.get('/export')
+async def export_notifications(type: Optional[NotificationType] = None,
+                               created_from: Optional[datetime] = None,
+                               created_to: Optional[datetime] = None,
+                               viewed: Optional[bool] = None,
+                               user_id: UUID = Depends(get_user_id)):
+    created_from = to_utc(created_from) if created_from else None
+    created_to = to_utc(created_to) if created_to else None
+    # anything wrong has to be caught here, once streaming started the 200 is already sent
+    if created_from and created_to and created_from > created_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='created_from must not be later than created_to')
+
+    # the session has to live as long as the response body, so it is opened
+    # inside the generator instead of coming from a dependency
+    async def body():
+        async with session_scope(session_router.for_read(user_id)) as session:
+            notification_service = get_notification_service(session)
+            async for chunk in notification_service.export(user_id, type, created_from, created_to, viewed,
+                                                           chunk_size=settings.EXPORT_CHUNK_SIZE):
+                yield chunk
+
+    return StreamingResponse(body(),
+                             media_type='application/x-ndjson',
+                             headers={'Content-Disposition': 'attachment; filename="notifications.ndjson"'})
@@ -0,0 +1,29 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+
+from src.api.deps import get_user_id, get_preference_service
+from src.exceptions.base import CloudsellNotifyException
+from src.schemas.preference import PreferenceOut, PreferenceSet
+from src.services.preference_service import PreferenceService
+
+router = APIRouter(prefix='/preferences', tags=['Preferences'])
+
+
+@router.get('/', response_model=list[PreferenceOut])
+async def get_preferences(user_id: UUID = Depends(get_user_id),
+                          preference_service: PreferenceService = Depends(get_preference_service)):
+    result = await preference_service.get(user_id)
+    return result
+
+
+@router.put('/', response_model=PreferenceOut)
+async def set_preference(preference: PreferenceSet,
+                         user_id: UUID = Depends(get_user_id),
+                         preference_service: PreferenceService = Depends(get_preference_service)):
+    try:
+        result = await preference_service.set(user_id, preference)
+        return result
+    except CloudsellNotifyException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
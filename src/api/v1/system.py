@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from starlette import status
+from starlette.responses import JSONResponse
+
+from src.core.metrics import metrics
+from src.core.readiness import readiness
+
+router = APIRouter(prefix='/system', tags=['System'])
+
+
+@router.get('/metrics')
+async def get_metrics():
+    return metrics.snapshot()
+
+
+@router.get('/ready')
+async def get_readiness():
+    status_code = status.HTTP_200_OK if readiness.is_ready() else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code,
+                        content={'ready': readiness.is_ready(), 'dependencies': readiness.report()})
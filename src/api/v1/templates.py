@@ -1,10 +1,17 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
 from jinja2 import TemplateNotFound
 from pydantic import UUID4
 
-from src.api.deps import get_current_admin, get_template_service
+from src.api.deps import (get_current_admin, get_template_service, get_read_template_service,
+                          get_read_template_stats_service)
 from src.exceptions.base import CloudsellNotifyException
-from src.schemas.template import TemplateOut, TemplateCreate
+from src.exceptions.template import NoSuchTemplate
+from src.schemas.template import (TemplateOut, TemplateCreate, TemplateVersionOut, TemplateStatsOut,
+                                  TemplateDeletedOut)
+from src.services.stats_service import TemplateStatsService
 from src.services.template_service import TemplateService
 from starlette import status
 
@@ -23,6 +30,30 @@ async def create_template(template: TemplateCreate,
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+STATS_MAX_DAYS = 366
+
+
+# declared before /{template_id} so 'stats' is not parsed as an id
+@router.get('/stats', response_model=list[TemplateStatsOut])
+async def get_template_stats(template_id: Optional[UUID4] = None,
+                             day_from: Optional[date] = None,
+                             day_to: Optional[date] = None,
+                             stats_service: TemplateStatsService = Depends(get_read_template_stats_service)):
+    day_to = day_to or datetime.utcnow().date()
+    day_from = day_from or day_to - timedelta(days=30)
+    if day_from > day_to or (day_to - day_from).days > STATS_MAX_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f'day_from must be before day_to and at most {STATS_MAX_DAYS} days apart')
+    result = await stats_service.get(day_from, day_to, template_id)
+    return result
+
+
+@router.get('/deleted', response_model=list[TemplateDeletedOut])
+async def get_deleted_templates(template_service: TemplateService = Depends(get_read_template_service)):
+    result = await template_service.get_deleted()
+    return result
+
+
 @router.get('/{template_id}')
 async def get_template(template_id: UUID4,
                        template_service: TemplateService = Depends(get_template_service)):
@@ -36,18 +67,49 @@ async def get_template(template_id: UUID4,
 
 
 @router.get('/', response_model=list[TemplateOut])
-async def get_templates(template_service: TemplateService = Depends(get_template_service)):
+async def get_templates(template_service: TemplateService = Depends(get_read_template_service)):
     result = await template_service.get_all()
     return result
 
 
-@router.delete('/{template_id}')
+@router.delete('/{template_id}', response_model=TemplateOut)
 async def delete_template(template_id: UUID4,
                           template_service: TemplateService = Depends(get_template_service)):
     try:
         result = await template_service.delete(template_id)
         return result
-    except TemplateNotFound as e:
+    except NoSuchTemplate as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except CloudsellNotifyException as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.put('/{template_id}', response_model=TemplateOut)
+async def update_template(template_id: UUID4,
+                          template: TemplateCreate,
+                          template_service: TemplateService = Depends(get_template_service)):
+    try:
+        result = await template_service.update(template_id, template)
+        return result
+    except NoSuchTemplate as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except CloudsellNotifyException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get('/{template_id}/versions', response_model=list[TemplateVersionOut])
+async def get_template_versions(template_id: UUID4,
+                                template_service: TemplateService = Depends(get_read_template_service)):
+    result = await template_service.get_versions(template_id)
+    return result
+
+
+@router.post('/{template_id}/versions/{version_id}/activate', response_model=TemplateOut)
+async def activate_template_version(template_id: UUID4,
+                                    version_id: UUID4,
+                                    template_service: TemplateService = Depends(get_template_service)):
+    try:
+        result = await template_service.activate_version(template_id, version_id)
+        return result
+    except NoSuchTemplate as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -0,0 +1,3 @@
+from src.client.publisher import NotificationPublisher, SyncNotificationPublisher
+from src.core.enums import NotificationType
+from src.schemas.notification import NotificationCreate
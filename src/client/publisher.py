@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractRobustConnection
+from aio_pika.pool import Pool
+
+from src.schemas.notification import NotificationCreate
+
+try:
+    from opentelemetry.propagate import inject
+except ImportError:
+    inject = None
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationPublisher:
+    def __init__(self,
+                 rabbit_url: str,
+                 queue: str,
+                 channels: int = 2,
+                 batch_size: int = 100,
+                 linger: float = 0.005):
+        self.rabbit_url = rabbit_url
+        self.queue = queue
+        self.channels = channels
+        self.batch_size = batch_size
+        self.linger = linger
+        self._connection_pool: Optional[Pool] = None
+        self._channel_pool: Optional[Pool] = None
+        self._lock = asyncio.Lock()
+        self._pending: list[tuple[str, aio_pika.Message, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._in_flight: set[asyncio.Task] = set()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def connect(self):
+        async with self._lock:
+            if self._channel_pool:
+                return
+            self._connection_pool = Pool(self._get_connection, max_size=1)
+            self._channel_pool = Pool(self._get_channel, max_size=self.channels)
+
+    async def publish(self,
+                      notification: NotificationCreate,
+                      priority: Optional[int] = None,
+                      idempotency_key: Optional[str] = None,
+                      queue: Optional[str] = None):
+        await self.connect()
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(queue or self.queue, self._message(notification, priority, idempotency_key), future)
+        # resolves once the broker has confirmed the message
+        await future
+
+    async def publish_many(self,
+                           notifications: Iterable[NotificationCreate],
+                           priority: Optional[int] = None,
+                           queue: Optional[str] = None):
+        await self.connect()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for notification in notifications:
+            future = loop.create_future()
+            self._enqueue(queue or self.queue, self._message(notification, priority, None), future)
+            futures.append(future)
+        await asyncio.gather(*futures)
+
+    async def flush(self):
+        self._flush()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
+        if self._channel_pool:
+            await self._channel_pool.close()
+            await self._connection_pool.close()
+            self._channel_pool = None
+            self._connection_pool = None
+
+    @staticmethod
+    def _message(notification: NotificationCreate,
+                 priority: Optional[int],
+                 idempotency_key: Optional[str]) -> aio_pika.Message:
+        # the consumer falls back to message_id as the idempotency key, so a
+        # key generated here still stops broker redeliveries being sent twice
+        message_id = idempotency_key or notification.idempotency_key or uuid.uuid4().hex
+        headers = {}
+        if inject:
+            inject(headers)
+        return aio_pika.Message(body=notification.model_dump_json().encode(),
+                                content_type='application/json',
+                                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                                message_id=message_id,
+                                priority=priority,
+                                timestamp=datetime.now(timezone.utc),
+                                headers=headers)
+
+    def _enqueue(self, queue: str, message: aio_pika.Message, future: asyncio.Future):
+        self._pending.append((queue, message, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif not self._flush_handle:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.linger, self._flush)
+
+    def _flush(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._publish_batch(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _publish_batch(self, batch: list[tuple[str, aio_pika.Message, asyncio.Future]]):
+        try:
+            async with self._channel_pool.acquire() as channel:
+                # publishes are pipelined on one channel and the broker
+                # confirms them together instead of one round trip each
+                results = await asyncio.gather(*(channel.default_exchange.publish(message, routing_key=queue)
+                                                 for queue, message, _ in batch),
+                                               return_exceptions=True)
+        except Exception as e:
+            logger.error(f"Failed to publish {len(batch)} notifications: {e}")
+            results = [e] * len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(None)
+
+    async def _get_connection(self) -> AbstractRobustConnection:
+        return await aio_pika.connect_robust(self.rabbit_url)
+
+    async def _get_channel(self) -> AbstractChannel:
+        async with self._connection_pool.acquire() as connection:
+            return await connection.channel(publisher_confirms=True)
+
+
+class SyncNotificationPublisher:
+    def __init__(self, rabbit_url: str, queue: str, timeout: Optional[float] = 30, **kwargs):
+        self.timeout = timeout
+        # publishes from every calling thread share one loop, so they are batched together
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='notification-publisher', daemon=True)
+        self._thread.start()
+        self._publisher = NotificationPublisher(rabbit_url, queue, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def publish(self,
+                notification: NotificationCreate,
+                priority: Optional[int] = None,
+                idempotency_key: Optional[str] = None,
+                queue: Optional[str] = None):
+        self._run(self._publisher.publish(notification, priority, idempotency_key, queue))
+
+    def publish_many(self,
+                     notifications: Iterable[NotificationCreate],
+                     priority: Optional[int] = None,
+                     queue: Optional[str] = None):
+        self._run(self._publisher.publish_many(list(notifications), priority, queue))
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        try:
+            self._run(self._publisher.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(self.timeout)
@@ -0,0 +1,143 @@
+import enum
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+from src.core.config import settings
+from src.core.exceptions import CircuitOpen
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, enum.Enum):
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+class CircuitBreaker:
+    def __init__(self,
+                 name: str,
+                 failure_rate: float = 0.5,
+                 slow_call_rate: float = 0.5,
+                 slow_call_threshold: Optional[float] = None,
+                 min_calls: int = 20,
+                 window: float = 30,
+                 open_for: float = 30,
+                 half_open_calls: int = 5):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_threshold = slow_call_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.open_for = open_for
+        self.half_open_calls = half_open_calls
+        self._state = CircuitState.CLOSED
+        self._changed_at = 0.0
+        # (finished_at, failed, slow) for the calls inside the window
+        self._calls: deque[tuple[float, bool, bool]] = deque()
+        self._trials = 0
+        self._trial_successes = 0
+        metrics.gauge(f'breaker.{name}.open', lambda: int(self.state != CircuitState.CLOSED))
+
+    @property
+    def state(self) -> CircuitState:
+        elapsed = time.monotonic() - self._changed_at
+        if self._state == CircuitState.OPEN and elapsed >= self.open_for:
+            self._transition(CircuitState.HALF_OPEN)
+        elif self._state == CircuitState.HALF_OPEN and self._probes_used() and elapsed >= self.open_for:
+            # probes that never reported back must not hold the circuit half-open forever
+            self._transition(CircuitState.OPEN)
+        return self._state
+
+    @property
+    def rejecting(self) -> bool:
+        # open, or half-open with every probe already handed out
+        state = self.state
+        return state == CircuitState.OPEN or (state == CircuitState.HALF_OPEN and self._probes_used())
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and not self._probes_used():
+            # only a few probe calls are let through until they prove the dependency healthy
+            self._trials += 1
+            return True
+        return False
+
+    def check(self):
+        if not self.allow():
+            metrics.inc(f'breaker.{self.name}.rejected')
+            raise CircuitOpen(f'{self.name} circuit is open')
+
+    def record(self, latency: float, failed: bool):
+        slow = self.slow_call_threshold is not None and latency >= self.slow_call_threshold
+        state = self.state
+        if state == CircuitState.HALF_OPEN:
+            if failed or slow:
+                self._transition(CircuitState.OPEN)
+                return
+            self._trial_successes += 1
+            if self._trial_successes >= self.half_open_calls:
+                self._transition(CircuitState.CLOSED)
+            return
+        if state == CircuitState.OPEN:
+            return
+
+        now = time.monotonic()
+        self._calls.append((now, failed, slow))
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+        if len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for _, f, _ in self._calls if f)
+        slow_calls = sum(1 for _, _, s in self._calls if s)
+        if failures / len(self._calls) >= self.failure_rate or slow_calls / len(self._calls) >= self.slow_call_rate:
+            self._transition(CircuitState.OPEN)
+
+    @asynccontextmanager
+    async def guard(self, is_failure: Callable[[Exception], bool] = lambda e: True):
+        self.check()
+        start = time.monotonic()
+        try:
+            yield
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            self.record(time.monotonic() - start, is_failure(e))
+            raise
+        else:
+            self.record(time.monotonic() - start, False)
+
+    def _probes_used(self) -> bool:
+        return self._trials >= self.half_open_calls
+
+    def _transition(self, state: CircuitState):
+        logger.warning(f"{self.name} circuit {self._state.value} -> {state.value}")
+        metrics.inc(f'breaker.{self.name}.{state.value}')
+        self._state = state
+        self._trials = 0
+        self._trial_successes = 0
+        self._changed_at = time.monotonic()
+        if state == CircuitState.CLOSED:
+            self._calls.clear()
+
+
+def _create(name: str, slow_call_threshold: Optional[float]) -> CircuitBreaker:
+    return CircuitBreaker(name,
+                          failure_rate=settings.BREAKER_FAILURE_RATE,
+                          slow_call_rate=settings.BREAKER_SLOW_CALL_RATE,
+                          slow_call_threshold=slow_call_threshold,
+                          min_calls=settings.BREAKER_MIN_CALLS,
+                          window=settings.BREAKER_WINDOW,
+                          open_for=settings.BREAKER_OPEN_FOR,
+                          half_open_calls=settings.BREAKER_HALF_OPEN_CALLS)
+
+
+database_breaker = _create('database', settings.BREAKER_DB_SLOW_CALL)
+smtp_breaker = _create('smtp', settings.BREAKER_SMTP_SLOW_CALL)
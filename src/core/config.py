@@ -3,10 +3,27 @@ import ssl
 from datetime import datetime, timedelta
 
 import certifi
+import logging
 from typing import Optional
 import aiohttp
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
+from src.core.exceptions import PublicKeyUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class RabbitMQLane(BaseModel):
+    queue: str
+    concurrency: int = 10
+    max_priority: Optional[int] = None
+    # a dedicated lane gets its own connection pool and SMTP budget, so
+    # latency-critical mail never waits behind bulk traffic on other lanes
+    dedicated: bool = False
+    db_pool_size: int = 2
+    smtp_concurrency: int = 2
+    smtp_rate_per_minute: Optional[float] = None
 
 
 class Settings(BaseSettings):
@@ -21,6 +38,21 @@ class Settings(BaseSettings):
     DB_DATABASE: str
     DB_DRIVER: str = 'asyncpg'
 
+    # db pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PGBOUNCER_MODE: bool = False
+    DB_CONSUMER_POOL_SIZE: int = 5
+    DB_CONSUMER_MAX_OVERFLOW: int = 5
+
+    # db replicas
+    DB_REPLICA_URLS: list[str] = []
+    DB_READ_AFTER_WRITE_WINDOW: float = 5.0
+
     #jwt
     JWT_ALGORITHM: str = "RS256"
     AUTH_SERVER_URL: str
@@ -31,10 +63,85 @@ class Settings(BaseSettings):
     SMTP_PORT: int
     SMTP_USERNAME: str
     SMTP_PASSWORD: str
+    SMTP_MAX_CONNECTIONS: int = 5
+    SMTP_RATE_PER_MINUTE: Optional[float] = None
+    SMTP_BURST: int = 10
+    SMTP_DOMAIN_RATE_PER_MINUTE: Optional[float] = None
+    SMTP_DOMAIN_BURST: int = 5
+    SMTP_LATENCY_TARGET: Optional[float] = None
+    SMTP_BULK_MAX_RECIPIENTS: int = 50
+    SMTP_BULK_MAX_BATCH: int = 500
+    SMTP_BULK_LINGER: float = 0.5
+
+    # inbox cache
+    INBOX_CACHE: Optional[str] = None
+    INBOX_CACHE_REDIS_URL: str = 'redis://localhost:6379/0'
+    INBOX_CACHE_TTL: int = 300
+    INBOX_CACHE_RECENT_SIZE: int = 50
+    INBOX_CACHE_MAX_UNREAD: int = 200
+
+    # circuit breakers
+    BREAKER_FAILURE_RATE: float = 0.5
+    BREAKER_SLOW_CALL_RATE: float = 0.5
+    BREAKER_MIN_CALLS: int = 20
+    BREAKER_WINDOW: float = 30
+    BREAKER_OPEN_FOR: float = 30
+    BREAKER_HALF_OPEN_CALLS: int = 5
+    BREAKER_DB_SLOW_CALL: Optional[float] = 5
+    BREAKER_SMTP_SLOW_CALL: Optional[float] = 30
+    CONSUMER_RAMP_INTERVAL: float = 5
+
+    # stats
+    STATS_FLUSH_INTERVAL: float = 5
+
+    # export
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    # preferences
+    PREFERENCES_REFRESH_INTERVAL: float = 5
+
+    # scheduler
+    SCHEDULER_HORIZON: int = 300
+    SCHEDULER_POLL_INTERVAL: float = 30
+    SCHEDULER_BATCH_SIZE: int = 1000
+    SCHEDULER_CONCURRENCY: int = 5
+    SCHEDULER_MAX_HELD: int = 10_000
+
+    # templates
+    TEMPLATE_POINTER_TTL: float = 5
+    TEMPLATE_CACHE_SIZE: int = 1000
+    TEMPLATE_PURGE_MODE: str = 'detach'
+    TEMPLATE_PURGE_BATCH_SIZE: int = 1000
+    TEMPLATE_PURGE_PAUSE: float = 0.5
+    TEMPLATE_PURGE_POLL_INTERVAL: float = 60
+
+    # rendering
+    RENDER_EXECUTOR: str = 'thread'
+    RENDER_MAX_WORKERS: int = 4
+    RENDER_MAX_PENDING: int = 100
+    RENDER_REJECT_WHEN_FULL: bool = False
+    RENDER_CACHE_TTL: float = 60
+    RENDER_CACHE_SIZE: int = 1000
+
+    # profiling
+    PROFILING_DIR: str = '/tmp/profiles'
+    PROFILING_HEADER: str = 'X-Profile'
+    PROFILING_HTTP_SAMPLE_RATE: float = 0
+    PROFILING_CONSUMER_SAMPLE_RATE: float = 0
+    PROFILING_ADMIN_ROLE: Optional[str] = None
+    SLOW_QUERY_THRESHOLD: Optional[float] = None
+
+    # tracing
+    TRACING_EXPORTER: Optional[str] = None
+    TRACING_SERVICE_NAME: str = 'cloudsell-notify'
+    TRACING_OTLP_ENDPOINT: str = 'http://localhost:4318/v1/traces'
+    TRACING_FILE: str = 'traces.jsonl'
 
     # rabbitmq
     RABBITMQ_URL: str
     RABBITMQ_QUEUE: str
+    RABBITMQ_LANES: list[RabbitMQLane] = []
+    RABBITMQ_DEDUP_CACHE_SIZE: int = 100_000
 
     __public_key: Optional[str] = None
     __public_key_last_update: Optional[datetime] = None
@@ -49,15 +156,25 @@ class Settings(BaseSettings):
         return f'{self.DB_TYPE}+{self.DB_DRIVER}://{self.DB_USERNAME}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_DATABASE}'
 
     @property
-    def JWT_PUBLIC_KEY(self):
-        if not self.__public_key or datetime.utcnow() - self.__public_key_last_update >= timedelta(hours=1):
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                asyncio.create_task(self._update_public_key())
-            else:
-                loop.run_until_complete(self._update_public_key())
+    def RABBITMQ_CONSUMER_LANES(self) -> list[RabbitMQLane]:
+        if self.RABBITMQ_LANES:
+            return self.RABBITMQ_LANES
+        return [RabbitMQLane(queue=self.RABBITMQ_QUEUE)]
+
+    async def get_public_key(self) -> str:
+        if not self.__public_key:
+            await self._update_public_key()
+        elif datetime.utcnow() - self.__public_key_last_update >= timedelta(hours=1) and not self.__lock.locked():
+            # serve the cached key while it is refreshed in the background
+            asyncio.create_task(self._refresh_public_key())
         return self.__public_key
 
+    async def _refresh_public_key(self):
+        try:
+            await self._update_public_key()
+        except Exception as e:
+            logger.error(str(e))
+
     async def _update_public_key(self):
         async with self.__lock:
             if not self.__public_key or datetime.utcnow() - self.__public_key_last_update >= timedelta(hours=1):
@@ -73,9 +190,8 @@ class Settings(BaseSettings):
                             else:
                                 raise Exception(f"Failed to fetch JWKS: {response.status} {response.reason}")
                 except Exception as e:
-                    self.__public_key = None  # Reset key on failure
-                    self.__public_key_last_update = None
-                    raise Exception(f"Error updating public key: {str(e)}")
+                    # a failed refresh leaves the last fetched key in place
+                    raise PublicKeyUnavailable(f"Error updating public key: {str(e)}")
 
 
 settings = Settings()
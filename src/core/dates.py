@@ -0,0 +1,9 @@
+from datetime import datetime, timezone
+
+
+def to_utc(moment: datetime) -> datetime:
+    # timestamp columns are naive UTC, so aware values are converted before
+    # they are compared with them; naive values are taken as UTC already
+    if moment.tzinfo:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
@@ -0,0 +1,6 @@
+import enum
+
+
+class NotificationType(enum.Enum):
+    EMAIL = "email"
+    SITE = "site"
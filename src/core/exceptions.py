@@ -1,2 +1,10 @@
 class InvalidToken(Exception):
-    ...
\ No newline at end of file
+    ...
+
+
+class CircuitOpen(Exception):
+    ...
+
+
+class PublicKeyUnavailable(Exception):
+    ...
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from src.core.config import settings
 from jose import jwt, JWTError
 
@@ -7,9 +9,10 @@ from src.core.exceptions import InvalidToken
 class JWTDecoder:
 
     @staticmethod
-    def decode(token: str, algorithm: str = settings.JWT_ALGORITHM, key: str = settings.JWT_PUBLIC_KEY) -> dict:
+    async def decode(token: str, algorithm: Optional[str] = None) -> dict:
         try:
-            payload = jwt.decode(token, settings.JWT_PUBLIC_KEY, algorithms=[algorithm])
+            key = await settings.get_public_key()
+            payload = jwt.decode(token, key, algorithms=[algorithm or settings.JWT_ALGORITHM])
             return payload
         except JWTError as e:
-            raise InvalidToken('Token is invalid or expired')
\ No newline at end of file
+            raise InvalidToken('Token is invalid or expired')
@@ -0,0 +1,64 @@
+import threading
+from collections import defaultdict, deque
+from typing import Callable
+
+
+class Timing:
+    def __init__(self, reservoir_size: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=reservoir_size)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self._samples.append(value)
+
+    def snapshot(self) -> dict:
+        samples = sorted(self._samples)
+        if not samples:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'avg': self.total / self.count,
+            'max': self.max,
+            'p50': samples[int(len(samples) * 0.5)],
+            'p99': samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = defaultdict(int)
+        self._timings: dict[str, Timing] = defaultdict(Timing)
+        self._gauges: dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self._timings[name].observe(value)
+
+    def gauge(self, name: str, func: Callable[[], float]):
+        self._gauges[name] = func
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {name: timing.snapshot() for name, timing in self._timings.items()}
+        gauges = {}
+        for name, func in self._gauges.items():
+            try:
+                gauges[name] = func()
+            except Exception:
+                gauges[name] = None
+        return {'counters': counters, 'timings': timings, 'gauges': gauges}
+
+
+metrics = Metrics()
@@ -0,0 +1,51 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler:
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self._active = False
+
+    @staticmethod
+    def sampled(rate: float) -> bool:
+        return rate > 0 and random.random() < rate
+
+    @contextmanager
+    def profile(self, name: str):
+        # cProfile hooks the whole event loop thread, so only one profile
+        # runs at a time and it also sees tasks interleaved with this one
+        if self._active:
+            yield
+            return
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._active = False
+            self._dump(profile, name)
+
+    def _dump(self, profile: cProfile.Profile, name: str):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            filename = f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}-{int(time.time() * 1000)}.prof"
+            path = os.path.join(self.output_dir, filename)
+            profile.dump_stats(path)
+            logger.info(f"Profile written to {path}")
+        except Exception as e:
+            logger.error(f"Failed to write profile: {e}")
+
+
+profiler = Profiler(settings.PROFILING_DIR)
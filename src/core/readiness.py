@@ -0,0 +1,47 @@
+import asyncio
+import enum
+import logging
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyState(str, enum.Enum):
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class Readiness:
+    def __init__(self):
+        self._dependencies: dict[str, dict] = {}
+
+    async def warm_up(self, name: str, hook: Callable[[], Awaitable], retry_interval: float = 5):
+        self._dependencies[name] = {'state': DependencyState.PENDING}
+        start = time.monotonic()
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                await hook()
+                self._dependencies[name] = {'state': DependencyState.READY,
+                                            'attempts': attempts,
+                                            'elapsed': time.monotonic() - start}
+                logger.info(f"{name} is ready")
+                return
+            except Exception as e:
+                self._dependencies[name] = {'state': DependencyState.FAILED,
+                                            'attempts': attempts,
+                                            'error': str(e)}
+                logger.warning(f"{name} warm-up failed, retrying in {retry_interval}s: {e}")
+                await asyncio.sleep(retry_interval)
+
+    def is_ready(self) -> bool:
+        return all(d['state'] == DependencyState.READY for d in self._dependencies.values())
+
+    def report(self) -> dict:
+        return self._dependencies
+
+
+readiness = Readiness()
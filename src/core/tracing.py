@@ -0,0 +1,57 @@
+import functools
+import logging
+import os
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# a proxy until setup_tracing installs a provider, spans are no-ops before that
+tracer = trace.get_tracer('cloudsell.notify')
+
+
+def setup_tracing():
+    if not settings.TRACING_EXPORTER:
+        return
+    if settings.TRACING_EXPORTER == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    elif settings.TRACING_EXPORTER == 'file':
+        exporter = ConsoleSpanExporter(out=open(settings.TRACING_FILE, 'a'),
+                                       formatter=lambda span: span.to_json(indent=None) + os.linesep)
+    else:
+        raise ValueError(f"Unknown tracing exporter: {settings.TRACING_EXPORTER}")
+
+    provider = TracerProvider(resource=Resource.create({'service.name': settings.TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    logger.info(f"Tracing enabled with the {settings.TRACING_EXPORTER} exporter")
+
+
+def shutdown_tracing():
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()
+
+
+def extract_context(headers: dict):
+    carrier = {key: value.decode() if isinstance(value, bytes) else str(value)
+               for key, value in (headers or {}).items()}
+    return propagate.extract(carrier)
+
+
+def traced(name: str = None):
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(span_name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
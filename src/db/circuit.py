@@ -0,0 +1,28 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.circuit_breaker import CircuitBreaker
+
+
+def install(engine: AsyncEngine, breaker: CircuitBreaker):
+    # every repository call runs its statements through these hooks, so the
+    # breaker sees their latency and outcome without wrapping each method
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('breaker_start', []).append(time.monotonic())
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        breaker.record(time.monotonic() - conn.info['breaker_start'].pop(), False)
+
+    @event.listens_for(engine.sync_engine, 'handle_error')
+    def handle_error(context):
+        started = context.connection.info.get('breaker_start') if context.connection is not None else None
+        latency = time.monotonic() - started.pop() if started else 0
+        # constraint violations and bad queries are the caller's problem,
+        # only lost connections and timeouts say the database is unwell
+        failed = context.is_disconnect or isinstance(context.sqlalchemy_exception, (OperationalError, InterfaceError))
+        breaker.record(latency, failed)
@@ -1,11 +1,122 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import time
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from src.core.circuit_breaker import CircuitBreaker, database_breaker
 from src.core.config import settings
+from src.core.metrics import metrics
+from src.db import circuit, slow_query
+
+
+def _instrumented_pool(name: str, breaker: Optional[CircuitBreaker] = None):
+    class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+        def _do_get(self):
+            if breaker:
+                # fail fast instead of queueing for a connection to a database that is down
+                breaker.check()
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                metrics.inc(f'db.{name}.checkout_timeouts')
+                if breaker:
+                    breaker.record(time.perf_counter() - start, True)
+                raise
+            finally:
+                metrics.observe(f'db.{name}.checkout_wait', time.perf_counter() - start)
+
+    return InstrumentedQueuePool
+
+
+def _connect_args() -> dict:
+    if settings.DB_PGBOUNCER_MODE:
+        # transaction pooling hands every transaction a different server
+        # connection, so named prepared statements must not be reused
+        return {
+            'statement_cache_size': 0,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f'__asyncpg_{uuid4()}__',
+        }
+    return {
+        'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+        'prepared_statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+def create_engine(name: str,
+                  url: str,
+                  pool_size: int,
+                  max_overflow: int,
+                  breaker: Optional[CircuitBreaker] = None) -> AsyncEngine:
+    new_engine = create_async_engine(
+        url=url,
+        poolclass=_instrumented_pool(name, breaker),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=_connect_args())
+
+    if settings.SLOW_QUERY_THRESHOLD is not None:
+        slow_query.install(new_engine, name, settings.SLOW_QUERY_THRESHOLD)
+    if breaker:
+        circuit.install(new_engine, breaker)
+
+    metrics.gauge(f'db.{name}.checked_out', lambda: new_engine.pool.checkedout())
+    metrics.gauge(f'db.{name}.overflow', lambda: max(new_engine.pool.overflow(), 0))
+    metrics.gauge(f'db.{name}.saturation',
+                  lambda: new_engine.pool.checkedout() / max(pool_size + max_overflow, 1))
+    return new_engine
+
+
+engine = create_engine('api',
+                       settings.DB_URL,
+                       pool_size=settings.DB_POOL_SIZE,
+                       max_overflow=settings.DB_MAX_OVERFLOW,
+                       breaker=database_breaker)
+consumer_engine = create_engine('consumer',
+                                settings.DB_URL,
+                                pool_size=settings.DB_CONSUMER_POOL_SIZE,
+                                max_overflow=settings.DB_CONSUMER_MAX_OVERFLOW,
+                                breaker=database_breaker)
+replica_engines = [create_engine(f'replica_{i}',
+                                 url,
+                                 pool_size=settings.DB_POOL_SIZE,
+                                 max_overflow=settings.DB_MAX_OVERFLOW)
+                   for i, url in enumerate(settings.DB_REPLICA_URLS)]
 
-engine = create_async_engine(
-    url=settings.DB_URL)
 AsyncSessionFactory = async_sessionmaker(bind=engine,
                                          expire_on_commit=False,
                                          class_=AsyncSession)
-Base = declarative_base()
\ No newline at end of file
+ReplicaSessionFactories = [async_sessionmaker(bind=replica_engine,
+                                              expire_on_commit=False,
+                                              class_=AsyncSession,
+                                              info={'replica': True})
+                           for replica_engine in replica_engines]
+ConsumerSessionFactory = async_sessionmaker(bind=consumer_engine,
+                                            expire_on_commit=False,
+                                            class_=AsyncSession)
+lane_engines = {lane.queue: create_engine(f'consumer_{lane.queue}',
+                                          settings.DB_URL,
+                                          pool_size=lane.db_pool_size,
+                                          max_overflow=0,
+                                          breaker=database_breaker)
+                for lane in settings.RABBITMQ_CONSUMER_LANES if lane.dedicated}
+LaneSessionFactories = {queue: async_sessionmaker(bind=lane_engine,
+                                                  expire_on_commit=False,
+                                                  class_=AsyncSession)
+                        for queue, lane_engine in lane_engines.items()}
+Base = declarative_base()
+
+
+async def warm_up():
+    for warm_engine in (engine, consumer_engine, *lane_engines.values(), *replica_engines):
+        async with warm_engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
@@ -0,0 +1,60 @@
+import itertools
+import time
+from typing import Hashable
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.core.config import settings
+from src.db.database import AsyncSessionFactory, ReplicaSessionFactories
+
+TEMPLATES_KEY = 'templates'
+
+
+class WriteTracker:
+    def __init__(self, window: float, max_size: int = 100_000):
+        self._window = window
+        self._max_size = max_size
+        self._writes: dict[str, float] = {}
+
+    def mark(self, key: Hashable):
+        self._writes[str(key)] = time.monotonic()
+        if len(self._writes) > self._max_size:
+            self._prune()
+
+    def recently_written(self, key: Hashable) -> bool:
+        key = str(key)
+        written_at = self._writes.get(key)
+        if written_at is None:
+            return False
+        if time.monotonic() - written_at > self._window:
+            self._writes.pop(key, None)
+            return False
+        return True
+
+    def _prune(self):
+        deadline = time.monotonic() - self._window
+        self._writes = {key: ts for key, ts in self._writes.items() if ts > deadline}
+
+
+class SessionRouter:
+    def __init__(self,
+                 primary: async_sessionmaker,
+                 replicas: list[async_sessionmaker],
+                 tracker: WriteTracker):
+        self._primary = primary
+        self._replicas = itertools.cycle(replicas) if replicas else None
+        self._tracker = tracker
+
+    def for_write(self) -> async_sessionmaker:
+        return self._primary
+
+    def for_read(self, key: Hashable = None) -> async_sessionmaker:
+        if self._replicas is None:
+            return self._primary
+        if key is not None and self._tracker.recently_written(key):
+            return self._primary
+        return next(self._replicas)
+
+
+write_tracker = WriteTracker(settings.DB_READ_AFTER_WRITE_WINDOW)
+session_router = SessionRouter(AsyncSessionFactory, ReplicaSessionFactories, write_tracker)
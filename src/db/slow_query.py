@@ -0,0 +1,41 @@
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def parameter_shape(parameters):
+    # logs the types of bound values, never the values themselves
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f'{len(parameters)} x {parameter_shape(parameters[0])}'
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def install(engine: AsyncEngine, name: str, threshold: float):
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        if elapsed >= threshold:
+            metrics.inc(f'db.{name}.slow_queries')
+            logger.warning(f"Slow query on {name} ({elapsed * 1000:.1f} ms): {statement} "
+                           f"params={parameter_shape(parameters)}")
+
+    @event.listens_for(engine.sync_engine, 'handle_error')
+    def handle_error(context):
+        # a failed statement never reaches after_cursor_execute
+        started = context.connection.info.get('query_start') if context.connection is not None else None
+        if started:
+            started.pop()
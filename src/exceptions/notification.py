@@ -2,4 +2,8 @@ from src.exceptions.base import CloudsellNotifyException
 
 
 class NotificationInsertFailed(CloudsellNotifyException):
+    ...
+
+
+class NotificationDuplicate(CloudsellNotifyException):
     ...
\ No newline at end of file
@@ -0,0 +1,5 @@
+from src.exceptions.base import CloudsellNotifyException
+
+
+class PreferenceUpdateFailed(CloudsellNotifyException):
+    ...
@@ -6,3 +6,7 @@ class TemplateInsertFailed(CloudsellNotifyException):
 
 class NoSuchTemplate(CloudsellNotifyException):
     ...
+
+
+class RenderQueueFull(CloudsellNotifyException):
+    ...
@@ -1,63 +1,219 @@
 import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from starlette import status
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
 
+from src.adapters.bulk_sender import BulkEmailBatcher
+from src.adapters.dedup import SeenSet
 from src.adapters.email_sender import SMTPEmailSender
+from src.adapters.inbox_cache import inbox_cache
 from src.adapters.notification_processor import NotificationProcessorFactory
+from src.adapters.rate_limiter import SendRateController, AIMDLimiter
+from src.adapters.render_cache import RenderCache
+from src.adapters.render_executor import RenderExecutor
 from src.adapters.rabbitmq_consumer import RabbitMQConsumer
+from src.adapters.scheduler import NotificationScheduler
+from src.adapters.suppression_cache import SuppressionCache
+from src.adapters.template_cache import TemplateVersionCache
+from src.adapters.template_purger import template_purger
+from src.adapters.template_stats import template_stats
+from src.api.middleware import ProfilingMiddleware, TracingMiddleware
 from src.api.v1.notifications import router as notification_router
+from src.api.v1.preferences import router as preference_router
 from src.api.v1.templates import router as template_router
+from src.api.v1.system import router as system_router
+from src.core.circuit_breaker import database_breaker, smtp_breaker
 from src.core.config import settings
-from src.api.deps import get_template_service, get_notification_service, get_session
-from src.db.database import AsyncSessionFactory
+from src.core.exceptions import CircuitOpen
+from src.core.readiness import readiness
+from src.core.tracing import setup_tracing, shutdown_tracing
+from src.db import database
+from src.db.database import AsyncSessionFactory, ConsumerSessionFactory, LaneSessionFactories
 
-app = FastAPI(
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json",
-    root_path="/",
-    title=settings.APP_NAME
-)
 
-app.include_router(template_router)
-app.include_router(notification_router)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_tracing()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origin_regex="https?://.*",
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-consumer: RabbitMQConsumer
+    render_executor = RenderExecutor(
+        kind=settings.RENDER_EXECUTOR,
+        max_workers=settings.RENDER_MAX_WORKERS,
+        max_pending=settings.RENDER_MAX_PENDING,
+        reject_when_full=settings.RENDER_REJECT_WHEN_FULL
+    )
 
-@app.on_event("startup")
-async def startup():
-    global consumer
+    rate_controller = SendRateController(
+        concurrency=AIMDLimiter(maximum=settings.SMTP_MAX_CONNECTIONS,
+                                latency_target=settings.SMTP_LATENCY_TARGET),
+        rate_per_minute=settings.SMTP_RATE_PER_MINUTE,
+        burst=settings.SMTP_BURST,
+        domain_rate_per_minute=settings.SMTP_DOMAIN_RATE_PER_MINUTE,
+        domain_burst=settings.SMTP_DOMAIN_BURST
+    )
 
     email_sender = SMTPEmailSender(
         smtp_server=settings.SMTP_SERVER,
         smtp_port=settings.SMTP_PORT,
         smtp_username=settings.SMTP_USERNAME,
-        smtp_password=settings.SMTP_PASSWORD
+        smtp_password=settings.SMTP_PASSWORD,
+        max_connections=settings.SMTP_MAX_CONNECTIONS,
+        rate_controller=rate_controller,
+        render_executor=render_executor,
+        breaker=smtp_breaker
+    )
+
+    bulk_sender = BulkEmailBatcher(
+        email_sender=email_sender,
+        max_recipients=settings.SMTP_BULK_MAX_RECIPIENTS,
+        max_batch=settings.SMTP_BULK_MAX_BATCH,
+        linger=settings.SMTP_BULK_LINGER
     )
 
+    suppression_cache = SuppressionCache(
+        session_factory=ConsumerSessionFactory,
+        refresh_interval=settings.PREFERENCES_REFRESH_INTERVAL
+    )
+
+    template_cache = TemplateVersionCache(pointer_ttl=settings.TEMPLATE_POINTER_TTL,
+                                          max_versions=settings.TEMPLATE_CACHE_SIZE)
+    render_cache = RenderCache(ttl=settings.RENDER_CACHE_TTL,
+                               max_size=settings.RENDER_CACHE_SIZE)
+
     processor_factory = NotificationProcessorFactory(
         email_sender=email_sender,
-        session_factory=AsyncSessionFactory
+        session_factory=ConsumerSessionFactory,
+        render_executor=render_executor,
+        suppression_cache=suppression_cache,
+        template_cache=template_cache,
+        bulk_sender=bulk_sender,
+        render_cache=render_cache
+    )
+
+    # dedicated lanes send through their own SMTP connections, concurrency
+    # limit and token bucket, and check out from their own database pool
+    lane_senders = {}
+    lane_processor_factories = {}
+    for lane in settings.RABBITMQ_CONSUMER_LANES:
+        if not lane.dedicated:
+            continue
+        lane_senders[lane.queue] = SMTPEmailSender(
+            smtp_server=settings.SMTP_SERVER,
+            smtp_port=settings.SMTP_PORT,
+            smtp_username=settings.SMTP_USERNAME,
+            smtp_password=settings.SMTP_PASSWORD,
+            max_connections=lane.smtp_concurrency,
+            rate_controller=SendRateController(
+                concurrency=AIMDLimiter(maximum=lane.smtp_concurrency,
+                                        latency_target=settings.SMTP_LATENCY_TARGET),
+                rate_per_minute=lane.smtp_rate_per_minute,
+                burst=settings.SMTP_BURST,
+                domain_rate_per_minute=settings.SMTP_DOMAIN_RATE_PER_MINUTE,
+                domain_burst=settings.SMTP_DOMAIN_BURST,
+                name=f'smtp.{lane.queue}'
+            ),
+            render_executor=render_executor,
+            breaker=smtp_breaker
+        )
+        lane_processor_factories[lane.queue] = NotificationProcessorFactory(
+            email_sender=lane_senders[lane.queue],
+            session_factory=LaneSessionFactories[lane.queue],
+            render_executor=render_executor,
+            suppression_cache=suppression_cache,
+            template_cache=template_cache,
+            render_cache=render_cache
+        )
+
+    scheduler = NotificationScheduler(
+        session_factory=ConsumerSessionFactory,
+        notification_processor_factory=processor_factory,
+        horizon=timedelta(seconds=settings.SCHEDULER_HORIZON),
+        poll_interval=settings.SCHEDULER_POLL_INTERVAL,
+        batch_size=settings.SCHEDULER_BATCH_SIZE,
+        concurrency=settings.SCHEDULER_CONCURRENCY,
+        max_held=settings.SCHEDULER_MAX_HELD
     )
 
     consumer = RabbitMQConsumer(
         rabbit_url=settings.RABBITMQ_URL,
-        queue=settings.RABBITMQ_QUEUE,
+        lanes=settings.RABBITMQ_CONSUMER_LANES,
         notification_processor_factory=processor_factory,
+        seen=SeenSet(settings.RABBITMQ_DEDUP_CACHE_SIZE),
+        scheduler=scheduler,
+        breakers=[database_breaker, smtp_breaker],
+        ramp_interval=settings.CONSUMER_RAMP_INTERVAL,
+        lane_processor_factories=lane_processor_factories,
     )
-    asyncio.create_task(consumer.start_consuming())
+
+    async def start_consumer():
+        # suppressions must be loaded before the first message is taken
+        await readiness.warm_up('preferences', suppression_cache.refresh)
+        await readiness.warm_up('rabbitmq', consumer.start_consuming)
+
+    # dependencies warm up concurrently in the background, so the app starts
+    # serving immediately and /system/ready reports when each one is usable
+    warm_ups = [
+        asyncio.create_task(readiness.warm_up('jwks', settings.get_public_key)),
+        asyncio.create_task(readiness.warm_up('database', database.warm_up)),
+        asyncio.create_task(readiness.warm_up('smtp', email_sender.warm_up)),
+        asyncio.create_task(start_consumer()),
+        asyncio.create_task(suppression_cache.run()),
+        asyncio.create_task(scheduler.run()),
+        asyncio.create_task(template_stats.run(AsyncSessionFactory, settings.STATS_FLUSH_INTERVAL)),
+        asyncio.create_task(template_purger.run(ConsumerSessionFactory,
+                                                mode=settings.TEMPLATE_PURGE_MODE,
+                                                batch_size=settings.TEMPLATE_PURGE_BATCH_SIZE,
+                                                pause=settings.TEMPLATE_PURGE_PAUSE,
+                                                poll_interval=settings.TEMPLATE_PURGE_POLL_INTERVAL)),
+    ]
+
+    yield
+
+    for task in warm_ups:
+        task.cancel()
+    await consumer.close()
+    await bulk_sender.close()
+    await email_sender.close()
+    for lane_sender in lane_senders.values():
+        await lane_sender.close()
+    await template_stats.flush(AsyncSessionFactory)
+    if inbox_cache:
+        await inbox_cache.close()
+    render_executor.shutdown()
+    shutdown_tracing()
+
+
+app = FastAPI(
+    docs_url="/docs",
+    redoc_url="/redoc",
+    openapi_url="/openapi.json",
+    root_path="/",
+    title=settings.APP_NAME,
+    lifespan=lifespan
+)
 
 
-@app.on_event("shutdown")
-async def shutdown():
-    global consumer
-    if consumer:
-        await consumer.close()
\ No newline at end of file
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(request: Request, exc: CircuitOpen):
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content={'detail': str(exc)},
+                        headers={'Retry-After': str(int(settings.BREAKER_OPEN_FOR))})
+
+
+app.include_router(template_router)
+app.include_router(notification_router)
+app.include_router(preference_router)
+app.include_router(system_router)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origin_regex="https?://.*",
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(TracingMiddleware)
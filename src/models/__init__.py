@@ -1,3 +1,6 @@
 from src.models.admin import *
 from src.models.notifications import *
-from src.models.templates import *
\ No newline at end of file
+from src.models.templates import *
+from src.models.preferences import *
+from src.models.scheduled import *
+from src.models.stats import *
\ No newline at end of file
@@ -1,23 +1,26 @@
-import enum
 import uuid
 from datetime import datetime
 
 from sqlalchemy import (Column,
                         UUID,
                         Enum,
-                        String, Boolean, ForeignKey, DateTime, JSON)
+                        String, Boolean, ForeignKey, DateTime, Index, UniqueConstraint)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
+from src.core.enums import NotificationType
 from src.db.database import Base
 
-
-class NotificationType(enum.Enum):
-    EMAIL = "email"
-    SITE = "site"
+IDEMPOTENCY_KEY_CONSTRAINT = 'uq_notifications_idempotency_key'
 
 
 class Notification(Base):
     __tablename__ = 'notifications'
+    __table_args__ = (Index('ix_notifications_extra_data', 'extra_data',
+                            postgresql_using='gin',
+                            postgresql_ops={'extra_data': 'jsonb_path_ops'}),
+                      Index('ix_notifications_user_id_created_at', 'user_id', 'created_at'),
+                      UniqueConstraint('idempotency_key', name=IDEMPOTENCY_KEY_CONSTRAINT))
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
 
@@ -28,10 +31,18 @@ class Notification(Base):
 
     title = Column(String, nullable=True, default='')
     message = Column(String, nullable=True, default='')
+    category = Column(String, nullable=True)
 
-    template_id = Column(UUID(as_uuid=True), ForeignKey('templates.id'), nullable=True)
+    template_id = Column(UUID(as_uuid=True), ForeignKey('templates.id'), nullable=True, index=True)
     template = relationship("Template", back_populates='notifications')
+    template_version_id = Column(UUID(as_uuid=True),
+                                 ForeignKey('template_versions.id', ondelete='SET NULL'),
+                                 nullable=True,
+                                 index=True)
 
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    extra_data = Column(JSON, nullable=True)
+    extra_data = Column(JSONB, nullable=True)
+    idempotency_key = Column(String, nullable=True)
+    # set when an email could not be delivered and will not be retried
+    failed_at = Column(DateTime, nullable=True)
 
@@ -0,0 +1,25 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import (Column,
+                        UUID,
+                        Enum,
+                        String, Boolean, DateTime, UniqueConstraint)
+
+from src.db.database import Base
+from src.models.notifications import NotificationType
+
+
+class NotificationPreference(Base):
+    __tablename__ = 'notification_preferences'
+    __table_args__ = (UniqueConstraint('user_id', 'channel', 'category'),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+
+    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    channel = Column(Enum(NotificationType), nullable=False)
+    # an empty category covers every category of the channel
+    category = Column(String, nullable=False, default='')
+    enabled = Column(Boolean, nullable=False, default=True)
+
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
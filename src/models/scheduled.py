@@ -0,0 +1,20 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import (Column,
+                        UUID,
+                        DateTime, JSON)
+
+from src.db.database import Base
+
+
+class ScheduledNotification(Base):
+    __tablename__ = 'scheduled_notifications'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    due_at = Column(DateTime, nullable=False, index=True)
+    payload = Column(JSON, nullable=False)
+    claimed_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
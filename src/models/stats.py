@@ -0,0 +1,17 @@
+from sqlalchemy import (Column,
+                        UUID,
+                        Date, Integer, ForeignKey)
+
+from src.db.database import Base
+
+
+class TemplateDailyStats(Base):
+    __tablename__ = 'template_daily_stats'
+
+    template_id = Column(UUID(as_uuid=True), ForeignKey('templates.id', ondelete='CASCADE'), primary_key=True)
+    # the day the notifications were created, so viewed/sent is a rate for that day's sends
+    day = Column(Date, primary_key=True)
+
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    viewed = Column(Integer, nullable=False, default=0)
@@ -4,7 +4,7 @@ from datetime import datetime
 from sqlalchemy import (Column,
                         UUID,
                         String,
-                        DateTime)
+                        DateTime, Integer, ForeignKey, UniqueConstraint)
 from sqlalchemy.orm import relationship
 
 from src.db.database import Base
@@ -15,11 +15,40 @@ class Template(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     name = Column(String, nullable=False)
+    # subject, body and required_fields mirror the current version
     subject = Column(String, nullable=False)
     body = Column(String, nullable=False)
     required_fields = Column(String, nullable=False, default='')
+    current_version_id = Column(UUID(as_uuid=True),
+                                ForeignKey('template_versions.id', use_alter=True),
+                                nullable=True)
 
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # set on delete; the row goes away once the purge job has detached its notifications
+    deleted_at = Column(DateTime, nullable=True, index=True)
+    # purge progress lives on the row, so every worker reports the same totals
+    purge_mode = Column(String, nullable=True)
+    purge_processed = Column(Integer, nullable=False, default=0, server_default='0')
+    purge_batches = Column(Integer, nullable=False, default=0, server_default='0')
+    purge_started_at = Column(DateTime, nullable=True)
+    purge_updated_at = Column(DateTime, nullable=True)
 
-    notifications = relationship("Notification", cascade="all, delete-orphan", back_populates="template")
+    # never cascade: a popular template owns millions of notifications, they are
+    # handled in small batches by the purge job instead of one huge transaction
+    notifications = relationship("Notification", back_populates="template", passive_deletes='all')
+
+
+class TemplateVersion(Base):
+    __tablename__ = 'template_versions'
+    __table_args__ = (UniqueConstraint('template_id', 'version'),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    template_id = Column(UUID(as_uuid=True), ForeignKey('templates.id', ondelete='CASCADE'), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    required_fields = Column(String, nullable=False, default='')
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -4,6 +4,7 @@ from uuid import UUID
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.tracing import traced
 from src.models.admin import Admin
 
 
@@ -17,6 +18,7 @@ class SqlaAdminRepository(AdminRepository):
     def __init__(self, session: AsyncSession):
         self._session = session
 
+    @traced()
     async def get(self, user_id: int | UUID) -> Admin:
         stmt = select(Admin).where(Admin.user_id == user_id)
         result = await self._session.execute(stmt)
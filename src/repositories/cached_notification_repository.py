@@ -0,0 +1,153 @@
+import logging
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from src.adapters.inbox_cache import InboxCache
+from src.core.metrics import metrics
+from src.models.notifications import Notification, NotificationType
+from src.repositories.notification_repository import NotificationRepository, SqlaNotificationRepository
+from src.schemas.notification import NotificationOut
+
+logger = logging.getLogger(__name__)
+
+
+class CachedNotificationRepository(NotificationRepository):
+    def __init__(self, repository: NotificationRepository, cache: InboxCache, primary=None):
+        self._repository = repository
+        self._cache = cache
+        # set when the repository reads from a replica: a lagging replica could
+        # miss a notification whose add was a no-op on the empty entry, and the
+        # load would cache that gap for the whole TTL
+        self._primary = primary
+
+    async def create(self, notification: Notification) -> Notification:
+        inserted = await self._repository.create(notification)
+        unread = not inserted.viewed and inserted.type == NotificationType.SITE
+        await self._write(inserted.user_id, self._cache.add(NotificationOut.from_orm(inserted), unread))
+        return inserted
+
+    async def update(self, notification: Notification) -> Notification:
+        updated = await self._repository.update(notification)
+        await self._write(updated.user_id, self._cache.invalidate(updated.user_id))
+        return updated
+
+    async def delete(self, notification_id: int | UUID):
+        deleted = await self._repository.delete(notification_id)
+        if deleted:
+            await self._write(deleted.user_id, self._cache.invalidate(deleted.user_id))
+        return deleted
+
+    async def set_failed(self, notification_id: int | UUID):
+        # cached payloads don't carry the delivery state
+        return await self._repository.set_failed(notification_id)
+
+    async def exists_by_idempotency_key(self, idempotency_key: str):
+        return await self._repository.exists_by_idempotency_key(idempotency_key)
+
+    async def get(self, notification_id: int | UUID):
+        return await self._repository.get(notification_id)
+
+    async def get_by_user_id(self, user_id: int | UUID):
+        return await self._repository.get_by_user_id(user_id)
+
+    async def get_unread(self, user_id: int | UUID, extra_data: dict = None):
+        # filtered reads are rare and not worth caching
+        if extra_data:
+            return await self._repository.get_unread(user_id, extra_data)
+        cached = await self._read(self._cache.get_unread(user_id))
+        if cached is not None:
+            return cached
+        token = await self._begin_load(user_id)
+        if not token:
+            return await self._repository.get_unread(user_id)
+        _, unread = await self._load(user_id, token)
+        return unread
+
+    async def set_viewed_many(self, user_id: int | UUID, notification_ids: list[UUID]):
+        result = await self._repository.set_viewed_many(user_id, notification_ids)
+        await self._write(user_id, self._cache.mark_viewed(user_id, notification_ids))
+        return result
+
+    async def get_many(self, user_id: int | UUID, quantity: int = None, extra_data: dict = None):
+        if extra_data or not quantity or quantity > self._cache.recent_size:
+            return await self._repository.get_many(user_id, quantity, extra_data)
+        cached = await self._read(self._cache.get_recent(user_id, quantity))
+        if cached is not None:
+            return cached
+        token = await self._begin_load(user_id)
+        if not token:
+            return await self._repository.get_many(user_id, quantity)
+        recent, _ = await self._load(user_id, token)
+        return recent[:quantity]
+
+    async def detach_template(self, template_id: int | UUID, limit: int):
+        # cached payloads carry no template, so detaching leaves them valid
+        return await self._repository.detach_template(template_id, limit)
+
+    async def delete_by_template(self, template_id: int | UUID, limit: int):
+        user_ids = await self._repository.delete_by_template(template_id, limit)
+        for user_id in set(user_ids):
+            await self._write(user_id, self._cache.invalidate(user_id))
+        return user_ids
+
+    def stream_by_user_id(self,
+                          user_id: int | UUID,
+                          notification_type: Optional[NotificationType] = None,
+                          created_from: Optional[datetime] = None,
+                          created_to: Optional[datetime] = None,
+                          viewed: Optional[bool] = None,
+                          chunk_size: int = 1000):
+        return self._repository.stream_by_user_id(user_id, notification_type, created_from,
+                                                  created_to, viewed, chunk_size)
+
+    async def _begin_load(self, user_id: int | UUID) -> Optional[str]:
+        # taking the load token before querying means any write that lands
+        # while the queries run discards this load instead of being lost.
+        # No token means another load is running or the unread list is too
+        # long to cache, so the caller just reads through
+        metrics.inc('inbox_cache.misses')
+        try:
+            return await self._cache.begin_load(user_id)
+        except Exception as e:
+            metrics.inc('inbox_cache.errors')
+            logger.error(f"Inbox cache read failed: {e}")
+            return None
+
+    async def _load(self, user_id: int | UUID, token: str) -> tuple[list[NotificationOut], list[NotificationOut]]:
+        if self._primary:
+            async with self._primary() as session:
+                return await self._fill(SqlaNotificationRepository(session), user_id, token)
+        return await self._fill(self._repository, user_id, token)
+
+    async def _fill(self,
+                    repository: NotificationRepository,
+                    user_id: int | UUID,
+                    token: str) -> tuple[list[NotificationOut], list[NotificationOut]]:
+        recent = [NotificationOut.from_orm(n) for n in await repository.get_many(user_id, self._cache.recent_size)]
+        unread = [NotificationOut.from_orm(n) for n in await repository.get_unread(user_id)]
+        cached_unread = unread if len(unread) <= self._cache.max_unread else None
+        await self._write(user_id, self._cache.finish_load(user_id, token, recent, cached_unread))
+        return recent, unread
+
+    async def _read(self, operation):
+        try:
+            result = await operation
+        except Exception as e:
+            metrics.inc('inbox_cache.errors')
+            logger.error(f"Inbox cache read failed: {e}")
+            return None
+        if result is not None:
+            metrics.inc('inbox_cache.hits')
+        return result
+
+    async def _write(self, user_id: int | UUID, operation):
+        try:
+            await operation
+        except Exception as e:
+            metrics.inc('inbox_cache.errors')
+            logger.error(f"Inbox cache write failed, invalidating: {e}")
+            try:
+                await self._cache.invalidate(user_id)
+            except Exception as e:
+                logger.error(f"Inbox cache invalidation failed: {e}")
@@ -1,10 +1,13 @@
-from typing import Sequence
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
 from uuid import UUID
 from abc import ABC, abstractmethod
 
-from sqlalchemy import select, update
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.tracing import traced
+from src.db.routing import write_tracker
 from src.models import NotificationType
 from src.models.notifications import Notification
 
@@ -18,6 +21,18 @@ class NotificationRepository(ABC):
     async def update(self, notification):
         raise NotImplementedError
 
+    @abstractmethod
+    async def delete(self, notification_id: int | UUID):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_failed(self, notification_id: int | UUID):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def exists_by_idempotency_key(self, idempotency_key: str):
+        raise NotImplementedError
+
     @abstractmethod
     async def get(self, notification_id: int | UUID):
         raise NotImplementedError
@@ -27,7 +42,7 @@ class NotificationRepository(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def get_unread(self, user_id: int | UUID):
+    async def get_unread(self, user_id: int | UUID, extra_data: dict = None):
         raise NotImplementedError
 
     @abstractmethod
@@ -35,7 +50,25 @@ class NotificationRepository(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def get_many(self, user_id: int | UUID, quantity: int = None):
+    async def get_many(self, user_id: int | UUID, quantity: int = None, extra_data: dict = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def detach_template(self, template_id: int | UUID, limit: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_by_template(self, template_id: int | UUID, limit: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_by_user_id(self,
+                          user_id: int | UUID,
+                          notification_type: Optional[NotificationType] = None,
+                          created_from: Optional[datetime] = None,
+                          created_to: Optional[datetime] = None,
+                          viewed: Optional[bool] = None,
+                          chunk_size: int = 1000):
         raise NotImplementedError
 
 
@@ -45,59 +78,185 @@ class SqlaNotificationRepository(NotificationRepository):
         self._session = session
 
 
+    @traced()
     async def create(self, notification: Notification) -> Notification:
         try:
             self._session.add(notification)
             await self._session.commit()
+            write_tracker.mark(notification.user_id)
             await self._session.refresh(notification)
             return notification
         except:
             await self._session.rollback()
             raise
 
+    @traced()
     async def update(self, notification: Notification) -> Notification:
         try:
             self._session.add(notification)
             await self._session.commit()
+            write_tracker.mark(notification.user_id)
             await self._session.refresh(notification)
             return notification
         except:
             await self._session.rollback()
             raise
 
+    @traced()
+    async def delete(self, notification_id: int | UUID) -> Optional[Notification]:
+        stmt = (delete(Notification)
+                .where(Notification.id == notification_id)
+                .returning(Notification)
+                .execution_options(synchronize_session=False))
+        try:
+            result = await self._session.execute(stmt)
+            deleted = result.scalars().first()
+            await self._session.commit()
+        except:
+            await self._session.rollback()
+            raise
+        if deleted:
+            write_tracker.mark(deleted.user_id)
+        return deleted
+
+    @traced()
+    async def set_failed(self, notification_id: int | UUID):
+        stmt = (update(Notification)
+                .where(Notification.id == notification_id)
+                .values(failed_at=datetime.utcnow())
+                .execution_options(synchronize_session=False))
+        try:
+            await self._session.execute(stmt)
+            await self._session.commit()
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def exists_by_idempotency_key(self, idempotency_key: str) -> bool:
+        stmt = select(Notification.id).where(Notification.idempotency_key == idempotency_key).limit(1)
+        return await self._session.scalar(stmt) is not None
+
+    @traced()
     async def get(self, notification_id: int | UUID) -> Notification:
         stmt = select(Notification).where(Notification.id == notification_id)
         notification = await self._session.execute(stmt)
         return notification.unique().scalars().first()
 
+    @traced()
     async def get_by_user_id(self, user_id: int | UUID) -> Sequence[Notification]:
         stmt = select(Notification).where(Notification.user_id == user_id)
         notifications = await self._session.execute(stmt)
         return notifications.scalars().all()
 
-    async def get_unread(self, user_id: int | UUID):
+    @traced()
+    async def get_unread(self, user_id: int | UUID, extra_data: dict = None):
         stmt = select(Notification).where(Notification.user_id == user_id,
                                           Notification.viewed == False,
                                           Notification.type == NotificationType.SITE)
+        if extra_data:
+            stmt = stmt.where(Notification.extra_data.contains(extra_data))
+        stmt = stmt.order_by(Notification.created_at.desc())
         notifications = await self._session.execute(stmt)
         return notifications.unique().scalars().all()
 
+    @traced()
     async def set_viewed_many(self, user_id: UUID, notification_ids: list[UUID]):
+        # only rows that flip to viewed are returned, so repeated calls
+        # don't count the same view twice in the rollups
         stmt = (
             update(Notification)
-            .where(Notification.id.in_(notification_ids), Notification.user_id == user_id)
+            .where(Notification.id.in_(notification_ids),
+                   Notification.user_id == user_id,
+                   Notification.viewed == False)
             .values(viewed=True)
+            .returning(Notification.template_id, Notification.created_at)
             .execution_options(synchronize_session="fetch")
         )
         result = await self._session.execute(stmt)
+        rows = result.all()
         await self._session.commit()
-        return result
-
-    async def get_many(self, user_id: int | UUID, quantity: int = None):
-        if not quantity:
-            stmt = select(Notification).where(Notification.user_id == user_id)
-            notifications = await self._session.execute(stmt)
-            return notifications.scalars().all()
-        stmt = select(Notification).where(Notification.user_id == user_id).order_by(Notification.created_at).limit(quantity)
+        write_tracker.mark(user_id)
+        return rows
+
+    @traced()
+    async def get_many(self, user_id: int | UUID, quantity: int = None, extra_data: dict = None):
+        stmt = select(Notification).where(Notification.user_id == user_id)
+        if extra_data:
+            # @> containment is served by the GIN index on extra_data
+            stmt = stmt.where(Notification.extra_data.contains(extra_data))
+        if quantity:
+            stmt = stmt.order_by(Notification.created_at.desc()).limit(quantity)
         notifications = await self._session.execute(stmt)
-        return notifications.scalars().all()
\ No newline at end of file
+        return notifications.scalars().all()
+
+    @traced()
+    async def detach_template(self, template_id: int | UUID, limit: int) -> int:
+        stmt = (
+            update(Notification)
+            .where(Notification.id.in_(self._template_batch(template_id, limit)))
+            .values(template_id=None, template_version_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        return await self._execute_batch(stmt)
+
+    @traced()
+    async def delete_by_template(self, template_id: int | UUID, limit: int) -> Sequence[UUID]:
+        # returns the owner of every deleted row, so their inboxes can be invalidated
+        stmt = (
+            delete(Notification)
+            .where(Notification.id.in_(self._template_batch(template_id, limit)))
+            .returning(Notification.user_id)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await self._session.execute(stmt)
+            user_ids = result.scalars().all()
+            await self._session.commit()
+        except:
+            await self._session.rollback()
+            raise
+        for user_id in set(user_ids):
+            write_tracker.mark(user_id)
+        return user_ids
+
+    @staticmethod
+    def _template_batch(template_id: int | UUID, limit: int):
+        # rows another transaction holds are skipped and picked up by a later batch
+        return (select(Notification.id)
+                .where(Notification.template_id == template_id)
+                .limit(limit)
+                .with_for_update(skip_locked=True))
+
+    async def _execute_batch(self, stmt) -> int:
+        try:
+            result = await self._session.execute(stmt)
+            await self._session.commit()
+            return result.rowcount
+        except:
+            await self._session.rollback()
+            raise
+
+    async def stream_by_user_id(self,
+                                user_id: int | UUID,
+                                notification_type: Optional[NotificationType] = None,
+                                created_from: Optional[datetime] = None,
+                                created_to: Optional[datetime] = None,
+                                viewed: Optional[bool] = None,
+                                chunk_size: int = 1000) -> AsyncIterator[Sequence[Notification]]:
+        stmt = select(Notification).where(Notification.user_id == user_id)
+        if notification_type:
+            stmt = stmt.where(Notification.type == notification_type)
+        if created_from:
+            stmt = stmt.where(Notification.created_at >= created_from)
+        if created_to:
+            stmt = stmt.where(Notification.created_at < created_to)
+        if viewed is not None:
+            stmt = stmt.where(Notification.viewed == viewed)
+        stmt = stmt.order_by(Notification.created_at).execution_options(yield_per=chunk_size)
+
+        # a server-side cursor keeps only one chunk of rows in memory
+        result = await self._session.stream_scalars(stmt)
+        async for chunk in result.partitions():
+            yield chunk
+            self._session.expunge_all()
@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.tracing import traced
+from src.models.notifications import NotificationType
+from src.models.preferences import NotificationPreference
+
+
+class PreferenceRepository(ABC):
+    @abstractmethod
+    async def upsert(self, user_id: int | UUID, channel: NotificationType, category: str, enabled: bool):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_by_user_id(self, user_id: int | UUID):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_updated_after(self, after: Optional[tuple[datetime, UUID]], limit: int):
+        raise NotImplementedError
+
+
+class SqlaPreferenceRepository(PreferenceRepository):
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    @traced()
+    async def upsert(self,
+                     user_id: int | UUID,
+                     channel: NotificationType,
+                     category: str,
+                     enabled: bool) -> NotificationPreference:
+        stmt = (
+            insert(NotificationPreference)
+            .values(user_id=user_id, channel=channel, category=category, enabled=enabled,
+                    updated_at=datetime.utcnow())
+            .on_conflict_do_update(index_elements=['user_id', 'channel', 'category'],
+                                   set_={'enabled': enabled, 'updated_at': datetime.utcnow()})
+            .returning(NotificationPreference)
+        )
+        try:
+            result = await self._session.execute(stmt)
+            preference = result.scalars().first()
+            await self._session.commit()
+            return preference
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def get_by_user_id(self, user_id: int | UUID) -> Sequence[NotificationPreference]:
+        stmt = select(NotificationPreference).where(NotificationPreference.user_id == user_id)
+        result = await self._session.execute(stmt)
+        return result.scalars().all()
+
+    @traced()
+    async def get_updated_after(self,
+                                after: Optional[tuple[datetime, UUID]],
+                                limit: int) -> Sequence[NotificationPreference]:
+        stmt = select(NotificationPreference)
+        if after:
+            stmt = stmt.where(tuple_(NotificationPreference.updated_at, NotificationPreference.id) > after)
+        stmt = stmt.order_by(NotificationPreference.updated_at, NotificationPreference.id).limit(limit)
+        result = await self._session.execute(stmt)
+        return result.scalars().all()
@@ -0,0 +1,91 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Sequence
+from uuid import UUID
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.tracing import traced
+from src.models.scheduled import ScheduledNotification
+
+
+class ScheduledNotificationRepository(ABC):
+    @abstractmethod
+    async def create(self, scheduled):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def claim_due(self, due_before: datetime, stale_before: datetime, limit: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def refresh_claims(self, scheduled_ids: list[UUID]):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_many(self, scheduled_ids: list[UUID]):
+        raise NotImplementedError
+
+
+class SqlaScheduledNotificationRepository(ScheduledNotificationRepository):
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    @traced()
+    async def create(self, scheduled: ScheduledNotification) -> ScheduledNotification:
+        try:
+            self._session.add(scheduled)
+            await self._session.commit()
+            return scheduled
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def claim_due(self,
+                        due_before: datetime,
+                        stale_before: datetime,
+                        limit: int) -> Sequence[ScheduledNotification]:
+        # a claim older than stale_before belongs to a worker that died
+        # before releasing the item, so it can be taken over
+        due = (
+            select(ScheduledNotification.id)
+            .where(ScheduledNotification.due_at <= due_before,
+                   (ScheduledNotification.claimed_at == None) | (ScheduledNotification.claimed_at < stale_before))
+            .order_by(ScheduledNotification.due_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(ScheduledNotification)
+            .where(ScheduledNotification.id.in_(due.scalar_subquery()))
+            .values(claimed_at=datetime.utcnow())
+            .returning(ScheduledNotification)
+        )
+        try:
+            result = await self._session.execute(stmt)
+            claimed = result.scalars().all()
+            await self._session.commit()
+            return claimed
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def refresh_claims(self, scheduled_ids: list[UUID]):
+        stmt = (update(ScheduledNotification)
+                .where(ScheduledNotification.id.in_(scheduled_ids))
+                .values(claimed_at=datetime.utcnow()))
+        try:
+            await self._session.execute(stmt)
+            await self._session.commit()
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def delete_many(self, scheduled_ids: list[UUID]):
+        stmt = delete(ScheduledNotification).where(ScheduledNotification.id.in_(scheduled_ids))
+        await self._session.execute(stmt)
+        await self._session.commit()
@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.tracing import traced
+from src.models.stats import TemplateDailyStats
+from src.models.templates import Template
+
+
+class TemplateStatsRepository(ABC):
+    @abstractmethod
+    async def increment_many(self, rows: list[dict]):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_range(self, day_from: date, day_to: date, template_id: Optional[int | UUID] = None):
+        raise NotImplementedError
+
+
+class SqlaTemplateStatsRepository(TemplateStatsRepository):
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    @traced()
+    async def increment_many(self, rows: list[dict]) -> int:
+        # rows of purged templates are left out; the key share lock keeps the
+        # remaining templates from being purged before the upsert lands
+        existing = (select(Template.id)
+                    .where(Template.id.in_({row['template_id'] for row in rows}))
+                    .with_for_update(key_share=True))
+        try:
+            template_ids = set((await self._session.scalars(existing)).all())
+            rows = [row for row in rows if row['template_id'] in template_ids]
+            if rows:
+                stmt = insert(TemplateDailyStats).values(rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['template_id', 'day'],
+                    set_={'sent': TemplateDailyStats.sent + stmt.excluded.sent,
+                          'failed': TemplateDailyStats.failed + stmt.excluded.failed,
+                          'viewed': TemplateDailyStats.viewed + stmt.excluded.viewed}
+                )
+                await self._session.execute(stmt)
+            await self._session.commit()
+            return len(rows)
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def get_range(self,
+                        day_from: date,
+                        day_to: date,
+                        template_id: Optional[int | UUID] = None) -> Sequence[TemplateDailyStats]:
+        stmt = select(TemplateDailyStats).where(TemplateDailyStats.day >= day_from,
+                                                TemplateDailyStats.day <= day_to)
+        if template_id:
+            stmt = stmt.where(TemplateDailyStats.template_id == template_id)
+        stmt = stmt.order_by(TemplateDailyStats.day, TemplateDailyStats.template_id)
+        result = await self._session.execute(stmt)
+        return result.scalars().all()
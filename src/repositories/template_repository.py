@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.templates import Template
+from src.core.tracing import traced
+from src.db.routing import write_tracker, TEMPLATES_KEY
+from src.models.templates import Template, TemplateVersion
 
 
 class TemplateRepository(ABC):
@@ -25,47 +28,213 @@ class TemplateRepository(ABC):
     async def get_all(self):
         raise NotImplementedError
 
+    @abstractmethod
+    async def get_deleted(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def purge(self, template_id: int | UUID):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def record_purge_batch(self, template_id: int | UUID, mode: str, processed: int):
+        raise NotImplementedError
+
     @abstractmethod
     async def get(self, template_id: int | UUID):
         raise NotImplementedError
 
+    @abstractmethod
+    async def add_version(self, template_id: int | UUID, version, name: str = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def activate_version(self, template_id: int | UUID, version_id: UUID):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_versions(self, template_id: int | UUID):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_version(self, version_id: UUID):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_current_version_id(self, template_id: int | UUID):
+        raise NotImplementedError
+
 
 class SqlaTemplateRepository(TemplateRepository):
     def __init__(self, session: AsyncSession):
         self._session = session
 
+    @traced()
     async def create(self, template: Template):
         try:
             self._session.add(template)
+            await self._session.flush()
+            version = TemplateVersion(template_id=template.id,
+                                      version=1,
+                                      subject=template.subject,
+                                      body=template.body,
+                                      required_fields=template.required_fields)
+            self._session.add(version)
+            await self._session.flush()
+            template.current_version_id = version.id
             await self._session.commit()
+            write_tracker.mark(TEMPLATES_KEY)
             await self._session.refresh(template)
             return template
         except:
             await self._session.rollback()
             raise
 
+    @traced()
     async def update(self, template):
         try:
             self._session.add(template)
             await self._session.commit()
+            write_tracker.mark(TEMPLATES_KEY)
             await self._session.refresh(template)
             return template
         except:
             await self._session.rollback()
             raise
 
+    @traced()
     async def delete(self, template_id: int | UUID):
-        stmt = delete(Template).where(Template.id == template_id).returning(Template)
+        # a soft delete touches one row, the notifications are left to the purge job
+        stmt = (update(Template)
+                .where(Template.id == template_id, Template.deleted_at.is_(None))
+                .values(deleted_at=datetime.utcnow())
+                .returning(Template))
         result = await self._session.execute(stmt)
         await self._session.commit()
+        write_tracker.mark(TEMPLATES_KEY)
         return result.scalars().first()
 
+    @traced()
     async def get_all(self):
-        stmt = select(Template)
+        stmt = select(Template).where(Template.deleted_at.is_(None))
         result = await self._session.execute(stmt)
         return result.unique().scalars().all()
 
+    @traced()
     async def get(self, template_id: int | UUID):
-        stmt = select(Template).where(Template.id == template_id)
+        stmt = select(Template).where(Template.id == template_id, Template.deleted_at.is_(None))
+        result = await self._session.execute(stmt)
+        return result.unique().scalars().first()
+
+    @traced()
+    async def get_deleted(self):
+        stmt = select(Template).where(Template.deleted_at.is_not(None)).order_by(Template.deleted_at)
+        result = await self._session.execute(stmt)
+        return result.scalars().all()
+
+    @traced()
+    async def purge(self, template_id: int | UUID) -> bool:
+        # only succeeds once nothing references the template any more,
+        # versions and rollups go with it through their cascading keys
+        stmt = delete(Template).where(Template.id == template_id, Template.deleted_at.is_not(None))
+        try:
+            result = await self._session.execute(stmt)
+            await self._session.commit()
+            return bool(result.rowcount)
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def record_purge_batch(self, template_id: int | UUID, mode: str, processed: int):
+        # incremented in place, so workers purging the same template add up
+        now = datetime.utcnow()
+        stmt = (update(Template)
+                .where(Template.id == template_id)
+                .values(purge_mode=mode,
+                        purge_processed=Template.purge_processed + processed,
+                        purge_batches=Template.purge_batches + 1,
+                        purge_started_at=func.coalesce(Template.purge_started_at, now),
+                        purge_updated_at=now,
+                        updated_at=Template.updated_at))
+        try:
+            await self._session.execute(stmt)
+            await self._session.commit()
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def add_version(self, template_id: int | UUID, version: TemplateVersion, name: str = None):
+        try:
+            template = await self._lock(template_id)
+            if not template:
+                return None
+            stmt = select(func.max(TemplateVersion.version)).where(TemplateVersion.template_id == template_id)
+            latest = await self._session.scalar(stmt)
+            version.template_id = template_id
+            version.version = (latest or 0) + 1
+            self._session.add(version)
+            await self._session.flush()
+            self._point_to(template, version)
+            # the name belongs to the template, not to a version
+            if name:
+                template.name = name
+            await self._session.commit()
+            write_tracker.mark(TEMPLATES_KEY)
+            await self._session.refresh(template)
+            return template
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def activate_version(self, template_id: int | UUID, version_id: UUID):
+        try:
+            template = await self._lock(template_id)
+            version = await self.get_version(version_id)
+            if not template or not version or version.template_id != template.id:
+                return None
+            self._point_to(template, version)
+            await self._session.commit()
+            write_tracker.mark(TEMPLATES_KEY)
+            await self._session.refresh(template)
+            return template
+        except:
+            await self._session.rollback()
+            raise
+
+    @traced()
+    async def get_versions(self, template_id: int | UUID):
+        stmt = (select(TemplateVersion)
+                .where(TemplateVersion.template_id == template_id)
+                .order_by(TemplateVersion.version))
         result = await self._session.execute(stmt)
-        return result.unique().scalars().first()
\ No newline at end of file
+        return result.scalars().all()
+
+    @traced()
+    async def get_version(self, version_id: UUID):
+        stmt = select(TemplateVersion).where(TemplateVersion.id == version_id)
+        result = await self._session.execute(stmt)
+        return result.scalars().first()
+
+    @traced()
+    async def get_current_version_id(self, template_id: int | UUID):
+        stmt = select(Template.current_version_id).where(Template.id == template_id,
+                                                         Template.deleted_at.is_(None))
+        return await self._session.scalar(stmt)
+
+    async def _lock(self, template_id: int | UUID):
+        stmt = (select(Template)
+                .where(Template.id == template_id, Template.deleted_at.is_(None))
+                .with_for_update())
+        result = await self._session.execute(stmt)
+        return result.scalars().first()
+
+    @staticmethod
+    def _point_to(template: Template, version: TemplateVersion):
+        # the pointer and the mirrored content change in one transaction
+        template.current_version_id = version.id
+        template.subject = version.subject
+        template.body = version.body
+        template.required_fields = version.required_fields
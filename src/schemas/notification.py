@@ -3,7 +3,7 @@ from typing import Optional
 
 from pydantic import BaseModel, UUID4, EmailStr
 
-from src.models import NotificationType
+from src.core.enums import NotificationType
 
 
 class NotificationCreate(BaseModel):
@@ -13,6 +13,11 @@ class NotificationCreate(BaseModel):
     message: Optional[str] = ''
     email: Optional[EmailStr] = None
     template_id: Optional[UUID4] = None
+    category: Optional[str] = None
+    idempotency_key: Optional[str] = None
+    send_at: Optional[datetime] = None
+    # campaign sends may wait briefly to share SMTP sessions and transactions
+    bulk: Optional[bool] = False
 
     extra_data: Optional[dict] = {}
 
@@ -27,3 +32,12 @@ class NotificationOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class NotificationExport(NotificationOut):
+    type: NotificationType
+    email: Optional[str] = None
+    template_id: Optional[UUID4] = None
+    category: Optional[str] = None
+    extra_data: Optional[dict] = None
+    failed_at: Optional[datetime] = None
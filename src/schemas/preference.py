@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, UUID4
+
+from src.core.enums import NotificationType
+
+
+class PreferenceSet(BaseModel):
+    channel: NotificationType
+    category: Optional[str] = ''
+    enabled: bool
+
+
+class PreferenceOut(PreferenceSet):
+    id: UUID4
+    user_id: UUID4
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 from pydantic import BaseModel, UUID4
@@ -16,6 +16,45 @@ class TemplateCreate(BaseModel):
 
 class TemplateOut(TemplateCreate):
     id: UUID4
+    current_version_id: Optional[UUID4] = None
 
     created_at: datetime
     updated_at: datetime
+    deleted_at: Optional[datetime] = None
+
+
+class TemplatePurgeProgress(BaseModel):
+    mode: str
+    processed: int
+    batches: int
+    started_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class TemplateDeletedOut(TemplateOut):
+    purge: Optional[TemplatePurgeProgress] = None
+
+
+class TemplateVersionOut(BaseModel):
+    id: UUID4
+    template_id: UUID4
+    version: int
+    required_fields: Optional[str] = ''
+    subject: str
+    body: str
+
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TemplateStatsOut(BaseModel):
+    template_id: UUID4
+    day: date
+    sent: int
+    failed: int
+    viewed: int
+
+    class Config:
+        from_attributes = True
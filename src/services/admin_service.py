@@ -1,6 +1,6 @@
 from uuid import UUID
 
-from src.core.exceptions import InvalidToken
+from src.core.exceptions import CircuitOpen, InvalidToken
 from src.core.jwt_decoder import JWTDecoder
 from src.exceptions.admin import AdminNotFound
 from src.exceptions.base import CloudsellNotifyException
@@ -18,12 +18,14 @@ class AdminService:
             if not admin:
                 raise AdminNotFound('No admin with such user id')
             return AdminSchema.from_orm(admin)
+        except CircuitOpen:
+            raise
         except:
             raise CloudsellNotifyException('Something went wrong')
 
     async def verify_admin(self, token: str):
         try:
-            payload = JWTDecoder.decode(token)
+            payload = await JWTDecoder.decode(token)
             if not payload.get('sub'):
                 raise CloudsellNotifyException('Invalid token')
             admin = await self.__repository.get(payload['sub'])
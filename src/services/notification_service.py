@@ -1,9 +1,24 @@
+from datetime import datetime
+from typing import AsyncIterator, Optional
 from uuid import UUID
 
-from src.exceptions.notification import NotificationInsertFailed
-from src.models.notifications import Notification
+from sqlalchemy.exc import IntegrityError
+
+from src.adapters.template_stats import template_stats
+from src.core.exceptions import CircuitOpen
+from src.exceptions.notification import NotificationInsertFailed, NotificationDuplicate
+from src.models.notifications import IDEMPOTENCY_KEY_CONSTRAINT, Notification, NotificationType
 from src.repositories.notification_repository import NotificationRepository
-from src.schemas.notification import NotificationOut, NotificationCreate
+from src.schemas.notification import NotificationOut, NotificationCreate, NotificationExport
+
+
+def _constraint_name(error: IntegrityError) -> Optional[str]:
+    # asyncpg's error, which names the constraint, is the cause of the DBAPI one
+    for candidate in (error.orig, getattr(error.orig, '__cause__', None)):
+        name = getattr(candidate, 'constraint_name', None)
+        if name:
+            return name
+    return None
 
 
 class NotificationService:
@@ -11,26 +26,62 @@ class NotificationService:
                  repository: NotificationRepository):
         self.__repository = repository
 
-    async def create(self, notification: NotificationCreate) -> NotificationOut:
+    async def create(self, notification: NotificationCreate, template_version_id: UUID = None) -> NotificationOut:
         try:
-            to_insert = Notification(**notification.dict())
+            to_insert = Notification(**notification.dict(exclude={'send_at', 'bulk'}),
+                                     template_version_id=template_version_id)
             inserted = await self.__repository.create(to_insert)
+            template_stats.record(inserted.template_id, inserted.created_at.date(), sent=1)
             return NotificationOut.from_orm(inserted)
+        except IntegrityError as e:
+            # foreign key violations, e.g. a purged template, are real failures
+            if notification.idempotency_key and _constraint_name(e) == IDEMPOTENCY_KEY_CONSTRAINT:
+                raise NotificationDuplicate(f'Notification {notification.idempotency_key} already processed')
+            print(e)
+            raise NotificationInsertFailed('Failed to create notification')
+        except CircuitOpen:
+            raise
         except Exception as e:
             print(e)
             raise NotificationInsertFailed('Failed to create notification')
 
-    async def get_unread(self, user_id: UUID) -> list[NotificationOut]:
-        notifications = await self.__repository.get_unread(user_id)
+    async def get_unread(self, user_id: UUID, extra_data: dict = None) -> list[NotificationOut]:
+        notifications = await self.__repository.get_unread(user_id, extra_data)
         result = [NotificationOut.from_orm(n) for n in notifications]
         return result
 
     async def set_viewed_many(self, user_id: UUID, notification_ids: list[UUID]) -> bool:
-        result = await self.__repository.set_viewed_many(user_id, notification_ids)
-        if result:
-            return True
+        viewed = await self.__repository.set_viewed_many(user_id, notification_ids)
+        for template_id, created_at in viewed:
+            template_stats.record(template_id, created_at.date(), viewed=1)
+        return True
 
-    async def get_last(self, user_id, quantity = 15) -> list[NotificationOut]:
-        notifications = await self.__repository.get_many(user_id, quantity)
+    async def is_processed(self, idempotency_key: str) -> bool:
+        return await self.__repository.exists_by_idempotency_key(idempotency_key)
+
+    async def discard(self, notification: NotificationOut, template_id: UUID = None):
+        # undoes create for a notification that goes back to the broker, so
+        # its redelivery is not mistaken for a duplicate
+        await self.__repository.delete(notification.id)
+        template_stats.record(template_id, notification.created_at.date(), sent=-1)
+
+    async def mark_failed(self, notification: NotificationOut, template_id: UUID = None):
+        await self.__repository.set_failed(notification.id)
+        template_stats.record(template_id, notification.created_at.date(), sent=-1, failed=1)
+
+    async def get_last(self, user_id, quantity = 15, extra_data: dict = None) -> list[NotificationOut]:
+        notifications = await self.__repository.get_many(user_id, quantity, extra_data)
         result = [NotificationOut.from_orm(n) for n in notifications]
-        return result
\ No newline at end of file
+        return result
+
+    async def export(self,
+                     user_id: UUID,
+                     notification_type: Optional[NotificationType] = None,
+                     created_from: Optional[datetime] = None,
+                     created_to: Optional[datetime] = None,
+                     viewed: Optional[bool] = None,
+                     chunk_size: int = 1000) -> AsyncIterator[str]:
+        chunks = self.__repository.stream_by_user_id(user_id, notification_type, created_from,
+                                                     created_to, viewed, chunk_size)
+        async for chunk in chunks:
+            yield ''.join(NotificationExport.from_orm(n).model_dump_json() + '\n' for n in chunk)
@@ -0,0 +1,28 @@
+from uuid import UUID
+
+from src.core.exceptions import CircuitOpen
+from src.exceptions.preference import PreferenceUpdateFailed
+from src.repositories.preference_repository import PreferenceRepository
+from src.schemas.preference import PreferenceSet, PreferenceOut
+
+
+class PreferenceService:
+    def __init__(self, repository: PreferenceRepository):
+        self.__repository = repository
+
+    async def get(self, user_id: UUID) -> list[PreferenceOut]:
+        preferences = await self.__repository.get_by_user_id(user_id)
+        return [PreferenceOut.from_orm(p) for p in preferences]
+
+    async def set(self, user_id: UUID, preference: PreferenceSet) -> PreferenceOut:
+        try:
+            result = await self.__repository.upsert(user_id,
+                                                    preference.channel,
+                                                    preference.category or '',
+                                                    preference.enabled)
+            return PreferenceOut.from_orm(result)
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            print(e)
+            raise PreferenceUpdateFailed('Failed to update preference')
@@ -0,0 +1,15 @@
+from datetime import date
+from typing import Optional
+from uuid import UUID
+
+from src.repositories.stats_repository import TemplateStatsRepository
+from src.schemas.template import TemplateStatsOut
+
+
+class TemplateStatsService:
+    def __init__(self, repository: TemplateStatsRepository):
+        self.__repository = repository
+
+    async def get(self, day_from: date, day_to: date, template_id: Optional[UUID] = None) -> list[TemplateStatsOut]:
+        stats = await self.__repository.get_range(day_from, day_to, template_id)
+        return [TemplateStatsOut.from_orm(s) for s in stats]
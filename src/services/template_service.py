@@ -1,10 +1,12 @@
 from uuid import UUID
 
+from src.core.exceptions import CircuitOpen
 from src.exceptions.base import CloudsellNotifyException
 from src.exceptions.template import TemplateInsertFailed, NoSuchTemplate
-from src.models import Template
+from src.models import Template, TemplateVersion
 from src.repositories.template_repository import TemplateRepository
-from src.schemas.template import TemplateCreate, TemplateOut
+from src.schemas.template import (TemplateCreate, TemplateOut, TemplateVersionOut, TemplateDeletedOut,
+                                  TemplatePurgeProgress)
 
 
 class TemplateService:
@@ -16,6 +18,8 @@ class TemplateService:
             to_insert = Template(**template.model_dump())
             template = await self.__repository.create(to_insert)
             return TemplateOut.from_orm(template)
+        except CircuitOpen:
+            raise
         except Exception as e:
             print(e)
             raise TemplateInsertFailed('Failed to create template')
@@ -30,15 +34,62 @@ class TemplateService:
         result = await self.__repository.get_all()
         return [TemplateOut.from_orm(t) for t in result]
 
-    async def delete(self, template_id: UUID):
+    async def delete(self, template_id: UUID) -> TemplateOut:
         try:
             result = await self.__repository.delete(template_id)
-            if not result:
-                raise NoSuchTemplate(f'Template with id {template_id} not found')
-            return result
+        except CircuitOpen:
+            raise
         except Exception as e:
             print(e)
             raise CloudsellNotifyException('Failed to delete template')
+        if not result:
+            raise NoSuchTemplate(f'Template with id {template_id} not found')
+        return TemplateOut.from_orm(result)
 
-    async def update(self):
-        ...
+    async def get_deleted(self) -> list[TemplateDeletedOut]:
+        result = await self.__repository.get_deleted()
+        return [TemplateDeletedOut(**TemplateOut.from_orm(t).model_dump(),
+                                   purge=TemplatePurgeProgress(mode=t.purge_mode,
+                                                               processed=t.purge_processed,
+                                                               batches=t.purge_batches,
+                                                               started_at=t.purge_started_at,
+                                                               updated_at=t.purge_updated_at)
+                                   if t.purge_started_at else None)
+                for t in result]
+
+    async def update(self, template_id: UUID, template: TemplateCreate) -> TemplateOut:
+        version = TemplateVersion(subject=template.subject,
+                                  body=template.body,
+                                  required_fields=template.required_fields or '')
+        try:
+            result = await self.__repository.add_version(template_id, version, template.name)
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            print(e)
+            raise TemplateInsertFailed('Failed to update template')
+        if not result:
+            raise NoSuchTemplate(f'Template with id {template_id} not found')
+        return TemplateOut.from_orm(result)
+
+    async def activate_version(self, template_id: UUID, version_id: UUID) -> TemplateOut:
+        result = await self.__repository.activate_version(template_id, version_id)
+        if not result:
+            raise NoSuchTemplate(f'Version {version_id} of template {template_id} not found')
+        return TemplateOut.from_orm(result)
+
+    async def get_versions(self, template_id: UUID) -> list[TemplateVersionOut]:
+        result = await self.__repository.get_versions(template_id)
+        return [TemplateVersionOut.from_orm(v) for v in result]
+
+    async def get_version(self, version_id: UUID) -> TemplateVersionOut:
+        result = await self.__repository.get_version(version_id)
+        if not result:
+            raise NoSuchTemplate(f'Template version with id {version_id} not found')
+        return TemplateVersionOut.from_orm(result)
+
+    async def get_current_version_id(self, template_id: UUID) -> UUID:
+        result = await self.__repository.get_current_version_id(template_id)
+        if not result:
+            raise NoSuchTemplate(f'Template with id {template_id} not found')
+        return result